@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.benchmark import compare_results, load_labeled_queries, run_size
+from src.experience import load_protocol_profiles, load_synonym_groups
+
+
+def _git_commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    return result.stdout.strip() or None
+
+
+def _run_isolated(workdir: Path, size: int, labeled: list[dict], topk: int, repeat: int, seed: int) -> dict:
+    # A fresh process per size keeps peak RSS and warm caches from leaking
+    # between sizes.
+    profiles = load_protocol_profiles(ROOT / "experience/protocols")
+    synonym_groups = load_synonym_groups(ROOT / "experience/synonyms")
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        future = pool.submit(run_size, workdir, size, labeled, profiles, topk, repeat, seed, synonym_groups)
+        return future.result()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark index build, load, latency and retrieval quality")
+    parser.add_argument(
+        "--sizes",
+        default="10000,100000,1000000",
+        help="Comma-separated synthetic corpus sizes in chunks (default: 10000,100000,1000000)",
+    )
+    parser.add_argument(
+        "--queries",
+        default="docs/skill-tests/retrieval-queries.json",
+        help="Labeled query set",
+    )
+    parser.add_argument("--topk", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Corpus/index directory (default: temporary)")
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    args = parser.parse_args()
+
+    queries_path = Path(args.queries).expanduser()
+    if not queries_path.is_absolute():
+        queries_path = ROOT / queries_path
+    labeled = load_labeled_queries(queries_path)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as tmp:
+        workdir = Path(args.workdir).expanduser().resolve() if args.workdir else Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for size in sizes:
+            result = _run_isolated(workdir, size, labeled, args.topk, args.repeat, args.seed)
+            results.append(result)
+            print(f"size={size} build={result['build_s']}s p50={result['query_p50_ms']}ms", file=sys.stderr)
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "queries": str(queries_path.relative_to(ROOT)) if queries_path.is_relative_to(ROOT) else str(queries_path),
+        "topk": args.topk,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.compare:
+        baseline = json.loads(Path(args.compare).expanduser().read_text(encoding="utf-8"))
+        report["comparison"] = {"baseline_commit": baseline.get("commit"), "sizes": compare_results(baseline, report)}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).expanduser().write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import json
-import pickle
 import sys
 from pathlib import Path
 
@@ -10,8 +8,13 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from src.bm25 import BM25Index
-from src.chunking import chunk_markdown
+from src.profiling import Profiler, activate, add_profile_arguments, phase
+
+PROFILER = activate(Profiler("build_index"))
+
+with phase("import"):
+    from src.experience import load_synonym_groups
+    from src.indexing import build_index
 
 
 def main() -> int:
@@ -20,39 +23,43 @@ def main() -> int:
     parser.add_argument("--out", required=True, help="Output index directory")
     parser.add_argument("--max-chars", type=int, default=800)
     parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument(
+        "--dedup-distance",
+        type=int,
+        default=3,
+        help="Max SimHash bit distance for near-duplicate chunks (default: 3)",
+    )
+    parser.add_argument("--no-dedup", action="store_true", help="Index every chunk, even duplicates")
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=2,
+        help="Index versions to keep under <out>/versions, including the new one (default: 2)",
+    )
+    parser.add_argument(
+        "--synonyms",
+        default=str(ROOT / "experience" / "synonyms"),
+        help="Synonym YAML directory compiled into the index (default: experience/synonyms)",
+    )
+    parser.add_argument("--no-synonyms", action="store_true", help="Build without query expansions")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    PROFILER.start(args.profile, args.profile_dump)
 
     manual_root = Path(args.manual).expanduser().resolve()
     out_dir = Path(args.out).expanduser().resolve()
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    md_files = list(manual_root.rglob("*.md"))
-    chunks = []
-    chunk_id = 0
-    for md_path in md_files:
-        text = md_path.read_text(encoding="utf-8", errors="ignore")
-        for chunk in chunk_markdown(text, source=str(md_path.relative_to(manual_root)), max_chars=args.max_chars, overlap=args.overlap):
-            chunk_id += 1
-            chunk["chunk_id"] = f"{chunk_id:06d}"
-            chunks.append(chunk)
-
-    texts = [c["text"] for c in chunks]
-    bm25 = BM25Index.build(texts)
-
-    meta_path = out_dir / "meta.json"
-    meta_path.write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    bm25_path = out_dir / "bm25.pkl"
-    with bm25_path.open("wb") as f:
-        pickle.dump({
-            "docs": bm25.docs,
-            "doc_freq": dict(bm25.doc_freq),
-            "avgdl": bm25.avgdl,
-            "k1": bm25.k1,
-            "b": bm25.b,
-        }, f)
-
-    print(f"Indexed {len(chunks)} chunks -> {out_dir}")
+
+    stats = build_index(
+        manual_root,
+        out_dir,
+        max_chars=args.max_chars,
+        overlap=args.overlap,
+        dedup_distance=None if args.no_dedup else args.dedup_distance,
+        keep_versions=args.keep_versions,
+        synonym_groups=None if args.no_synonyms else load_synonym_groups(Path(args.synonyms).expanduser()),
+    )
+
+    print(f"Indexed {stats['indexed']} chunks -> {out_dir} (version {stats['version']}, {stats['duplicates']} near-duplicates collapsed)")
     return 0
 
 
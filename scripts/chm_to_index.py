@@ -1,8 +1,6 @@
 from __future__ import annotations
 
 import argparse
-import json
-import pickle
 import sys
 from pathlib import Path
 
@@ -10,17 +8,16 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from src.bm25 import BM25Index
-from src.chunking import chunk_markdown
-from src.chm_extract import extract_chm
-from src.html_to_md import decode_html_bytes, html_to_markdown
+from src.profiling import Profiler, activate, add_profile_arguments, phase
 
-def _normalize_device(device: str) -> str:
-    value = device.strip().lower()
-    if "-v" in value and value.rsplit("-v", 1)[1].isdigit():
-        return value.rsplit("-v", 1)[0]
-    return value
+PROFILER = activate(Profiler("chm_to_index"))
 
+with phase("import"):
+    from src.chm_extract import extract_chm
+    from src.devices import normalize_device
+    from src.html_to_md import decode_html_bytes, html_to_markdown
+    from src.experience import load_synonym_groups
+    from src.indexing import build_index
 
 def convert_html_to_md(input_root: Path, out_root: Path) -> int:
     out_root.mkdir(parents=True, exist_ok=True)
@@ -36,46 +33,6 @@ def convert_html_to_md(input_root: Path, out_root: Path) -> int:
     return len(html_files)
 
 
-def build_index(manual_root: Path, out_dir: Path, max_chars: int, overlap: int) -> int:
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    md_files = list(manual_root.rglob("*.md"))
-    chunks = []
-    chunk_id = 0
-    for md_path in md_files:
-        text = md_path.read_text(encoding="utf-8", errors="ignore")
-        for chunk in chunk_markdown(
-            text,
-            source=str(md_path.relative_to(manual_root)),
-            max_chars=max_chars,
-            overlap=overlap,
-        ):
-            chunk_id += 1
-            chunk["chunk_id"] = f"{chunk_id:06d}"
-            chunks.append(chunk)
-
-    texts = [c["text"] for c in chunks]
-    bm25 = BM25Index.build(texts)
-
-    meta_path = out_dir / "meta.json"
-    meta_path.write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    bm25_path = out_dir / "bm25.pkl"
-    with bm25_path.open("wb") as f:
-        pickle.dump(
-            {
-                "docs": bm25.docs,
-                "doc_freq": dict(bm25.doc_freq),
-                "avgdl": bm25.avgdl,
-                "k1": bm25.k1,
-                "b": bm25.b,
-            },
-            f,
-        )
-
-    return len(chunks)
-
-
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Extract CHM, convert HTML to Markdown, and build BM25 index in one command."
@@ -95,12 +52,33 @@ def main() -> int:
     parser.add_argument("--index-out", help="Index output directory override")
     parser.add_argument("--max-chars", type=int, default=800)
     parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument(
+        "--dedup-distance",
+        type=int,
+        default=3,
+        help="Max SimHash bit distance for near-duplicate chunks (default: 3)",
+    )
+    parser.add_argument("--no-dedup", action="store_true", help="Index every chunk, even duplicates")
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=2,
+        help="Index versions to keep under <out>/versions, including the new one (default: 2)",
+    )
+    parser.add_argument(
+        "--synonyms",
+        default=str(ROOT / "experience" / "synonyms"),
+        help="Synonym YAML directory compiled into the index (default: experience/synonyms)",
+    )
+    parser.add_argument("--no-synonyms", action="store_true", help="Build without query expansions")
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    PROFILER.start(args.profile, args.profile_dump)
 
     input_path = Path(args.input).expanduser().resolve()
     if not input_path.exists():
         raise SystemExit(f"CHM not found: {input_path}")
-    device = _normalize_device(args.device)
+    device = normalize_device(args.device)
 
     html_out = (
         Path(args.html_out).expanduser().resolve()
@@ -118,13 +96,23 @@ def main() -> int:
         else (ROOT / "data" / device)
     )
 
-    extract_chm(input_path, html_out)
-    html_count = convert_html_to_md(html_out, md_out)
-    chunk_count = build_index(md_out, index_out, args.max_chars, args.overlap)
+    with phase("extract_chm"):
+        extract_chm(input_path, html_out)
+    with phase("html_to_md"):
+        html_count = convert_html_to_md(html_out, md_out)
+    stats = build_index(
+        md_out,
+        index_out,
+        max_chars=args.max_chars,
+        overlap=args.overlap,
+        dedup_distance=None if args.no_dedup else args.dedup_distance,
+        keep_versions=args.keep_versions,
+        synonym_groups=None if args.no_synonyms else load_synonym_groups(Path(args.synonyms).expanduser()),
+    )
 
     print(f"Extracted CHM -> {html_out}")
     print(f"Converted HTML to Markdown: {html_count} files -> {md_out}")
-    print(f"Indexed {chunk_count} chunks -> {index_out}")
+    print(f"Indexed {stats['indexed']} chunks -> {index_out} (version {stats['version']}, {stats['duplicates']} near-duplicates collapsed)")
     return 0
 
 
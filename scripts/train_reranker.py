@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.benchmark import generate_corpus, heldout_comparison, load_labeled_queries, training_groups
+from src.experience import load_protocol_profiles, load_synonym_groups
+from src.indexing import build_index
+from src.rerank import DEFAULT_WEIGHTS_PATH, FEATURES, RERANK_CANDIDATES, train_pairwise
+from src.search import SearchIndex
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Train the search reranker offline on labeled queries")
+    parser.add_argument(
+        "--queries",
+        default="docs/skill-tests/retrieval-queries.json",
+        help="Labeled query set",
+    )
+    parser.add_argument("--index", help="Existing index to train on (default: build a synthetic corpus)")
+    parser.add_argument("--size", type=int, default=10000, help="Synthetic corpus size in chunks")
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="Synthetic corpus seed (default: 1, so the benchmark's seed-0 corpus stays unseen)",
+    )
+    parser.add_argument(
+        "--eval-seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic corpus the held-out check searches (default: 0)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Write the weights even when they do not beat BM25 on held-out queries",
+    )
+    parser.add_argument("--candidates", type=int, default=RERANK_CANDIDATES)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--out", default=str(DEFAULT_WEIGHTS_PATH), help="Weights JSON to write")
+    args = parser.parse_args()
+
+    queries_path = Path(args.queries).expanduser()
+    if not queries_path.is_absolute():
+        queries_path = ROOT / queries_path
+    labeled = load_labeled_queries(queries_path)
+    profiles = load_protocol_profiles(ROOT / "experience/protocols")
+
+    synonym_groups = load_synonym_groups(ROOT / "experience/synonyms")
+    with tempfile.TemporaryDirectory(prefix="train-reranker-") as tmp:
+        if args.index:
+            index_dir = Path(args.index).expanduser().resolve()
+            trained_on = str(index_dir)
+            eval_dir = index_dir
+        else:
+            generate_corpus(Path(tmp) / "corpus", args.size, seed=args.seed)
+            index_dir = Path(tmp) / "index"
+            build_index(Path(tmp) / "corpus", index_dir, synonym_groups=synonym_groups)
+            trained_on = f"synthetic corpus, {args.size} chunks, seed {args.seed}"
+            generate_corpus(Path(tmp) / "eval-corpus", args.size, seed=args.eval_seed)
+            eval_dir = Path(tmp) / "eval-index"
+            build_index(Path(tmp) / "eval-corpus", eval_dir, synonym_groups=synonym_groups)
+        train_index = SearchIndex.load(index_dir)
+        groups = training_groups(train_index, labeled, profiles, args.candidates)
+        heldout = heldout_comparison(train_index, SearchIndex.load(eval_dir), labeled, profiles, epochs=args.epochs)
+
+    weights = train_pairwise(groups, epochs=args.epochs)
+    payload = {
+        "features": list(FEATURES),
+        "weights": weights,
+        "trained_on": trained_on,
+        "queries": str(queries_path.relative_to(ROOT)) if queries_path.is_relative_to(ROOT) else str(queries_path),
+        "candidates": args.candidates,
+        "pairs": sum(
+            sum(1 for _, rel in group if rel) * sum(1 for _, rel in group if not rel) for group in groups
+        ),
+        "heldout": heldout,
+    }
+    bm25, reranked = heldout["bm25"], heldout["reranked"]
+    gain = reranked["mrr"] > bm25["mrr"] and all(reranked[k] >= bm25[k] for k in bm25)
+    if not gain and not args.force:
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+        print("reranker does not beat BM25 on held-out queries; weights not written", file=sys.stderr)
+        return 1
+    out_path = Path(args.out).expanduser()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(payload, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,27 +9,94 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from src.validate_cli import validate_plan
+from src.grounding import GroundingChecker
+from src.validate_cli import DEFAULT_RULES_PATH, DEFAULT_SCHEMA_PATH, PlanValidator, validate_plan
+
+
+def _iter_batch(path: Path):
+    """Yield ``(label, plan_or_error)`` for a JSONL file or a directory of JSON files."""
+    if path.is_dir():
+        for plan_path in sorted(path.glob("*.json")):
+            try:
+                yield plan_path.name, json.loads(plan_path.read_text(encoding="utf-8"))
+            except ValueError as exc:
+                yield plan_path.name, exc
+        return
+    with path.open(encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield f"{path.name}:{lineno}", json.loads(line)
+            except ValueError as exc:
+                yield f"{path.name}:{lineno}", exc
+
+
+def _validate_batch(validator: PlanValidator, path: Path, grounding: GroundingChecker | None) -> int:
+    results = []
+    for label, plan in _iter_batch(path):
+        report = None
+        if isinstance(plan, Exception):
+            errors = [f"JSON 解析失败: {plan}"]
+        else:
+            errors = validator.validate(plan)
+            if grounding is not None and isinstance(plan, dict):
+                extra, report = grounding.check(plan)
+                errors += extra
+        result = {"input": label, "status": "invalid" if errors else "ok", "errors": errors}
+        if report is not None:
+            result["grounding_ms"] = report["elapsed_ms"]
+        results.append(result)
+    invalid = sum(1 for r in results if r["errors"])
+    print(json.dumps({
+        "status": "invalid" if invalid else "ok",
+        "total": len(results),
+        "invalid": invalid,
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+    return 1 if invalid else 0
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Validate CLI plan JSON")
     parser.add_argument("--input", help="JSON file path (default: stdin)")
+    parser.add_argument(
+        "--batch",
+        help="Validate many plans: a JSONL file (one plan per line) or a directory of *.json files.",
+    )
     parser.add_argument(
         "--delete-input",
         action="store_true",
         help="Delete --input file after validation (success or failure).",
     )
+    parser.add_argument(
+        "--ground",
+        action="store_true",
+        help="Also check that every command appears in the chunks its refs cite.",
+    )
+    parser.add_argument(
+        "--index",
+        help="Index directory for --ground (default: data/<plan device>)",
+    )
     parser.add_argument(
         "--schema",
-        default=".claude/skills/huawei-datacom-cli/schemas/cli_plan.schema.json",
+        default=DEFAULT_SCHEMA_PATH,
     )
     parser.add_argument(
         "--rules",
-        default=".claude/skills/huawei-datacom-cli/rules/dangerous_commands.txt",
+        default=DEFAULT_RULES_PATH,
     )
     args = parser.parse_args()
 
+    def _resolve(path_str: str) -> Path:
+        path = Path(path_str).expanduser()
+        return path if path.is_absolute() else ROOT / path
+
+    grounding = GroundingChecker(ROOT, args.index) if args.ground else None
+    if args.batch:
+        validator = PlanValidator(_resolve(args.schema), _resolve(args.rules))
+        return _validate_batch(validator, Path(args.batch).expanduser(), grounding)
+
     input_path: Path | None = None
     try:
         if args.input:
@@ -38,19 +105,21 @@ def main() -> int:
         else:
             data = json.loads(sys.stdin.read())
 
-        def _resolve(path_str: str) -> Path:
-            path = Path(path_str).expanduser()
-            return path if path.is_absolute() else ROOT / path
-
         errors = validate_plan(
             data,
             _resolve(args.schema),
             _resolve(args.rules),
         )
+        extra: dict = {}
+        if grounding is not None:
+            ground_errors, report = grounding.check(data)
+            errors += ground_errors
+            if report is not None:
+                extra["grounding_ms"] = report["elapsed_ms"]
         if errors:
-            print(json.dumps({"status": "invalid", "errors": errors}, ensure_ascii=False, indent=2))
+            print(json.dumps({"status": "invalid", "errors": errors, **extra}, ensure_ascii=False, indent=2))
             return 1
-        print(json.dumps({"status": "ok"}, ensure_ascii=False))
+        print(json.dumps({"status": "ok", **extra}, ensure_ascii=False))
         return 0
     finally:
         if args.delete_input and input_path is not None:
@@ -1 +1,10 @@
 """Local modules for Huawei manual RAG."""
+
+
+def __getattr__(name: str):
+    # Imported on demand so ``import src.<module>`` stays cheap for the CLIs.
+    if name == "ManualSearcher":
+        from src.api import ManualSearcher
+
+        return ManualSearcher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.devices import current_version_dir, index_exists, normalize_device, resolve_index_dir
+from src.experience import detect_intent, load_protocol_profiles_cached, profile_cache_path
+from src.grounding import GroundingChecker
+from src.payloads import build_queries, missing_device_payload, missing_index_payload, ok_payload
+from src.rerank import Reranker
+from src.search import SearchIndex
+from src.validate_cli import DEFAULT_RULES_PATH, DEFAULT_SCHEMA_PATH, get_validator
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class ManualSearcher:
+    """In-process entry point for intent detection, search and plan validation.
+
+    Returns the same payloads as ``scripts/search_manual.py`` and
+    ``scripts/validate_cli.py`` without a subprocess per call. Profiles and
+    device indexes load lazily on first use and are shared by every caller;
+    a loaded index is read-only, so concurrent searches need no locking.
+    The ``a*`` coroutines run the sync methods on a thread pool: index and
+    chunk-store reads overlap there, while BM25 scoring is pure Python and
+    still takes turns on the GIL.
+
+    With ``reload_interval`` set, a background thread polls each loaded
+    index's ``current`` pointer and hot-swaps newly published versions (see
+    ``reload``). A replaced index, like a chunk store of an old version, is
+    closed once the last search using it returns.
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        max_workers: int = 4,
+        schema_path: Path | None = None,
+        rules_path: Path | None = None,
+        reload_interval: float | None = None,
+        rerank_model: Path | None = None,
+    ):
+        self.root = root or ROOT
+        self.schema_path = schema_path or self.root / DEFAULT_SCHEMA_PATH
+        self.rules_path = rules_path or self.root / DEFAULT_RULES_PATH
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="manual-searcher")
+        self._lock = threading.Lock()
+        self._profiles: dict[str, dict[str, Any]] | None = None
+        self._indexes: dict[Path, SearchIndex] = {}
+        # Searches running on each index, and replaced indexes still in use.
+        self._users: dict[int, int] = {}
+        self._retired: dict[int, SearchIndex] = {}
+        self._index_locks: dict[Path, threading.Lock] = {}
+        self._grounding = GroundingChecker(self.root)
+        self.reranker = Reranker.load(rerank_model)
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        if reload_interval:
+            self._watcher = threading.Thread(
+                target=self._watch, args=(reload_interval,), name="manual-searcher-reload", daemon=True
+            )
+            self._watcher.start()
+
+    def profiles(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            if self._profiles is None:
+                self._profiles = load_protocol_profiles_cached(
+                    self.root / "experience" / "protocols", profile_cache_path(self.root)
+                )
+            return self._profiles
+
+    def detect_intent(self, text: str) -> dict[str, Any]:
+        return detect_intent(text, self.profiles())
+
+    def get_index(self, index_dir: Path) -> SearchIndex | None:
+        """Loaded index for ``index_dir``, or ``None`` if it was never built.
+
+        Each directory loads once; concurrent first callers wait on a
+        per-directory lock instead of loading it twice.
+        """
+        with self._lock:
+            index = self._indexes.get(index_dir)
+            if index is not None:
+                return index
+            dir_lock = self._index_locks.setdefault(index_dir, threading.Lock())
+        with dir_lock:
+            with self._lock:
+                index = self._indexes.get(index_dir)
+            if index is not None:
+                return index
+            if not index_exists(index_dir):
+                return None
+            index = SearchIndex.load(index_dir)
+            index.warm()
+            with self._lock:
+                self._indexes[index_dir] = index
+            return index
+
+    @contextmanager
+    def _using(self, index_dir: Path) -> Iterator[SearchIndex | None]:
+        """The loaded index for ``index_dir``, kept open until the block exits."""
+        while True:
+            index = self.get_index(index_dir)
+            if index is None:
+                yield None
+                return
+            with self._lock:
+                # A reload may have replaced it since ``get_index`` returned.
+                if self._indexes.get(index_dir) is index:
+                    self._users[id(index)] = self._users.get(id(index), 0) + 1
+                    break
+        try:
+            yield index
+        finally:
+            retired = None
+            with self._lock:
+                self._users[id(index)] -= 1
+                if not self._users[id(index)]:
+                    del self._users[id(index)]
+                    retired = self._retired.pop(id(index), None)
+            if retired is not None:
+                retired.close()
+
+    def _retire(self, index: SearchIndex) -> None:
+        """Close ``index`` now if no search uses it, else when the last one ends."""
+        with self._lock:
+            if self._users.get(id(index)):
+                self._retired[id(index)] = index
+                return
+        index.close()
+
+    def reload(self) -> list[Path]:
+        """Swap in newly published versions of the loaded indexes.
+
+        A new version is loaded and warmed while searches keep using the old
+        one; the swap is a single dict assignment, so searches already
+        holding the old index finish on it before it is closed. Chunk stores
+        of replaced versions are closed the same way. Returns the
+        directories swapped.
+        """
+        with self._lock:
+            loaded = list(self._indexes.items())
+        swapped = []
+        for index_dir, index in loaded:
+            if current_version_dir(index_dir) == index.version_dir or not index_exists(index_dir):
+                continue
+            fresh = SearchIndex.load(index_dir)
+            fresh.warm()
+            with self._lock:
+                self._indexes[index_dir] = fresh
+            self._retire(index)
+            swapped.append(index_dir)
+        self._grounding.evict()
+        return swapped
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+            except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+                # A version pruned or still being read mid-reload; retry next tick.
+                continue
+
+    def search(
+        self,
+        text: str,
+        device: str | None = None,
+        query: str | None = None,
+        topk: int = 5,
+        sections: int = 20,
+        context: int = 0,
+        index_dir: str | None = None,
+        filters: dict[str, list[str]] | None = None,
+        snippet: int = 0,
+        rerank: int = 0,
+    ) -> dict:
+        """Search payload for ``text``; ``filters`` as from ``src.filters.parse_filters``."""
+        intent = self.detect_intent(text)
+        normalized_device = normalize_device(device)
+        if not normalized_device:
+            return missing_device_payload(text, intent)
+
+        resolved = resolve_index_dir(self.root, normalized_device, index_dir)
+        with self._using(resolved) as index:
+            if index is None:
+                return missing_index_payload(self.root, text, intent, normalized_device, resolved)
+            queries = build_queries(text, intent, query)
+            hits = index.search(
+                queries,
+                topk=topk,
+                sections=sections,
+                context=context,
+                filters=filters,
+                snippet=snippet,
+                reranker=self.reranker if rerank > 0 else None,
+                rerank=rerank,
+                intent=intent,
+            )
+        return ok_payload(text, intent, normalized_device, hits)
+
+    def validate(self, plan: dict, ground: bool = False, index_dir: str | None = None) -> dict:
+        """Validation payload for ``plan``, as ``scripts/validate_cli.py --input`` prints it."""
+        errors = get_validator(self.schema_path, self.rules_path).validate(plan)
+        extra: dict = {}
+        if ground:
+            ground_errors, report = self._grounding.check(plan, index_dir)
+            errors += ground_errors
+            if report is not None:
+                extra["grounding_ms"] = report["elapsed_ms"]
+        if errors:
+            return {"status": "invalid", "errors": errors, **extra}
+        return {"status": "ok", **extra}
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def adetect_intent(self, text: str) -> dict[str, Any]:
+        return await self._run(self.detect_intent, text)
+
+    async def asearch(self, text: str, **kwargs) -> dict:
+        return await self._run(self.search, text, **kwargs)
+
+    async def avalidate(self, plan: dict, **kwargs) -> dict:
+        return await self._run(self.validate, plan, **kwargs)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._executor.shutdown(wait=True)
+        self._grounding.close()
+        with self._lock:
+            for index in [*self._indexes.values(), *self._retired.values()]:
+                index.close()
+            self._retired.clear()
+
+    def __enter__(self) -> "ManualSearcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "ManualSearcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
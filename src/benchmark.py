@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+from src.experience import detect_intent
+from src.indexing import build_index
+from src.payloads import build_queries
+from src.profiling import peak_rss_mb
+from src.rerank import DEFAULT_WEIGHTS_PATH, RERANK_CANDIDATES, Reranker, chunk_features, train_pairwise
+from src.search import SearchIndex
+
+# Pages the labeled queries in docs/skill-tests/retrieval-queries.json point at.
+GOLDEN_PAGES = {
+    "配置指南/OSPF/0000/配置OSPF基本功能.md": (
+        "# 配置OSPF基本功能\n\n"
+        "## 背景信息\n\n创建OSPF进程、指定Router ID并划分区域后，设备之间才能建立OSPF邻居关系。\n\n"
+        "## 操作步骤\n\n执行命令 system-view，进入系统视图。\n\n"
+        "```\nsystem-view\nospf 1 router-id 1.1.1.1\narea 0\nnetwork 10.1.1.0 0.0.0.255\n```\n\n"
+        "## 参数说明\n\n| 参数 | 参数说明 |\n| --- | --- |\n| process-id | OSPF进程号 |\n| router-id | 设备的Router ID |\n"
+    ),
+    "配置指南/OSPF/0000/配置OSPF接口.md": (
+        "# 配置OSPF接口\n\n"
+        "## 背景信息\n\n在接口上使能OSPF后，接口所在网段会加入OSPF区域。\n\n"
+        "## 操作步骤\n\n"
+        "```\ninterface GigabitEthernet1/0/1\nip address 10.1.1.1 24\nospf enable 1 area 0\n```\n"
+    ),
+    "配置指南/OSPF/0000/配置OSPF Hello报文定时器.md": (
+        "# 配置OSPF Hello报文定时器\n\n"
+        "## 背景信息\n\nOSPF通过Hello报文发现和维持邻居关系，两端Hello定时器必须一致。\n\n"
+        "## 操作步骤\n\n"
+        "```\ninterface GigabitEthernet1/0/1\nospf timer hello 10\nospf timer dead 40\n```\n"
+    ),
+    "命令参考/OSPF/0000/silent-interface.md": (
+        "# silent-interface\n\n"
+        "## 命令功能\n\nsilent-interface命令用来禁止接口接收和发送OSPF报文。\n\n"
+        "## 命令格式\n\n```\nsilent-interface { all | interface-type interface-number }\n```\n"
+    ),
+    "配置指南/安全策略/0000/配置安全策略.md": (
+        "# 配置安全策略\n\n"
+        "## 操作步骤\n\n"
+        "```\nsecurity-policy\nrule name policy1\nsource-zone trust\ndestination-zone untrust\naction permit\n```\n"
+    ),
+}
+
+_PROTOCOLS = [
+    "OSPF", "OSPFv3", "BGP", "IS-IS", "RIP", "VRRP", "BFD", "MPLS", "LDP", "VLAN",
+    "STP", "ACL", "NAT", "IPsec", "PIM", "IGMP", "DHCP", "NTP", "SNMP", "QoS",
+]
+_FEATURES = [
+    "基本功能", "认证", "路由聚合", "定时器", "邻居", "负载分担", "虚连接", "NSSA区域",
+    "路由引入", "GR", "快速收敛", "报文过滤", "接口参数", "优先级", "缺省路由",
+]
+_ROOTS = ["配置指南", "命令参考", "告警处理"]
+_SENTENCES = [
+    "执行命令 system-view，进入系统视图。",
+    "配置完成后，执行 display 命令检查配置结果。",
+    "缺省情况下，该功能处于未使能状态。",
+    "该命令仅在 {p} 进程视图下生效。",
+    "修改{p}{f}参数后，邻居关系可能会重新建立。",
+    "两端设备的{f}配置必须保持一致，否则无法建立连接。",
+    "当网络规模较大时，建议配置{f}以减少资源占用。",
+]
+
+
+def _section(rng: random.Random, protocol: str, feature: str, name: str) -> str:
+    cmd = protocol.lower().replace("-", "")
+    body = " ".join(
+        rng.choice(_SENTENCES).format(p=protocol, f=feature) for _ in range(rng.randint(2, 4))
+    )
+    lines = [f"## {name}", "", body]
+    if name == "操作步骤":
+        lines += ["", "```", f"{cmd} {rng.randint(1, 100)}", f"{cmd} {feature} {rng.randint(1, 65535)}", "```"]
+    elif name == "参数说明":
+        lines += ["", "| 参数 | 参数说明 | 取值 |", "| --- | --- | --- |",
+                  "| process-id | 进程号 | 整数形式，取值范围是1～65535 |"]
+    return "\n".join(lines)
+
+
+def generate_corpus(out_dir: Path, chunks: int, seed: int = 0, sections_per_page: int = 5) -> int:
+    """Write a synthetic Huawei-style Markdown manual of about ``chunks`` chunks.
+
+    Every section is short enough to become one chunk. The golden pages used
+    by the labeled queries are always included, in the same
+    ``root/protocol/NNNN/`` layout as the generated pages so path shape
+    alone cannot tell them apart. Returns the page count.
+    """
+    rng = random.Random(seed)
+    for rel, text in GOLDEN_PAGES.items():
+        path = out_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+
+    names = ["背景信息", "前置任务", "操作步骤", "参数说明", "检查配置结果", "配置举例"]
+    pages = max(1, chunks // sections_per_page)
+    for n in range(pages):
+        protocol = rng.choice(_PROTOCOLS)
+        feature = rng.choice(_FEATURES)
+        root = rng.choice(_ROOTS)
+        path = out_dir / root / protocol / f"{n // 1000:04d}" / f"{protocol}{feature}-{n}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        parts = [f"# 配置{protocol}{feature}"]
+        parts += [_section(rng, protocol, feature, name) for name in rng.sample(names, sections_per_page - 1)]
+        path.write_text("\n\n".join(parts) + "\n", encoding="utf-8")
+    return pages + len(GOLDEN_PAGES)
+
+
+def load_labeled_queries(path: Path) -> list[dict]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def training_groups(
+    index: SearchIndex,
+    labeled: list[dict],
+    profiles: dict[str, dict[str, Any]],
+    candidates: int = RERANK_CANDIDATES,
+) -> list[list[tuple[list[float], bool]]]:
+    """Reranker features of each labeled query's top BM25 candidates.
+
+    A candidate is relevant when it covers one of the query's relevant
+    pages, itself or through a folded duplicate, as ``recall_at_k`` counts
+    hits.
+    """
+    groups = []
+    for item in labeled:
+        intent = detect_intent(item["input"], profiles)
+        terms, scores, ranked = index.candidates(build_queries(item["input"], intent))
+        head = ranked[:candidates]
+        if not head:
+            continue
+        relevant = set(item["relevant"])
+        group = []
+        for i in head:
+            chunk = index.meta[i]
+            features = chunk_features(chunk, index.heading_terms(i), scores[i], scores[head[0]], terms, intent)
+            sources = {chunk.get("source")} | {d["source"] for d in chunk.get("duplicates", [])}
+            group.append((features, bool(sources & relevant)))
+        groups.append(group)
+    return groups
+
+
+def heldout_comparison(
+    train_index: SearchIndex,
+    eval_index: SearchIndex,
+    labeled: list[dict],
+    profiles: dict[str, dict[str, Any]],
+    topk: int = 5,
+    epochs: int = 200,
+) -> dict[str, dict[str, float]]:
+    """Leave-one-out quality of BM25 alone and of a trained reranker.
+
+    Each query is scored by weights trained on ``train_index`` without it,
+    and searched on ``eval_index``, so neither the query nor the corpus was
+    seen in training.
+    """
+    per_query = [training_groups(train_index, [item], profiles) for item in labeled]
+    totals = {"bm25": [0.0, 0.0], "reranked": [0.0, 0.0]}
+    for n, item in enumerate(labeled):
+        groups = [group for m, fold in enumerate(per_query) if m != n for group in fold]
+        weights = train_pairwise(groups, epochs=epochs)
+        intent = detect_intent(item["input"], profiles)
+        queries = build_queries(item["input"], intent)
+        for name, reranker in (("bm25", None), ("reranked", Reranker(weights))):
+            hits = eval_index.search(queries, topk=topk, reranker=reranker, rerank=RERANK_CANDIDATES, intent=intent)
+            ranked = _hit_sources(hits)
+            totals[name][0] += recall_at_k(ranked, item["relevant"], topk)
+            totals[name][1] += reciprocal_rank(ranked, item["relevant"])
+    count = len(labeled) or 1
+    return {
+        name: {f"recall@{topk}": round(recall / count, 4), "mrr": round(rr / count, 4)}
+        for name, (recall, rr) in totals.items()
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[rank]
+
+
+def recall_at_k(ranked: list[set[str]], relevant: list[str], k: int) -> float:
+    """Share of ``relevant`` sources covered by the first ``k`` hits, each
+    hit given as the set of sources it covers."""
+    if not relevant:
+        return 0.0
+    covered = set().union(*ranked[:k])
+    return len(covered & set(relevant)) / len(relevant)
+
+
+def reciprocal_rank(ranked: list[set[str]], relevant: list[str]) -> float:
+    for rank, sources in enumerate(ranked, start=1):
+        if sources & set(relevant):
+            return 1.0 / rank
+    return 0.0
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def _hit_sources(hits: list[dict]) -> list[set[str]]:
+    # A hit stands for every near-duplicate folded into it, and which copy is
+    # indexed is arbitrary among identical pages, so it covers all of them.
+    return [{hit["source"]} | {d["source"] for d in hit.get("duplicates", [])} for hit in hits]
+
+
+def run_size(
+    workdir: Path,
+    size: int,
+    labeled: list[dict],
+    profiles: dict[str, dict[str, Any]],
+    topk: int = 5,
+    repeat: int = 5,
+    seed: int = 0,
+    synonym_groups: list[dict[str, Any]] | None = None,
+    reranker: Reranker | None = None,
+) -> dict:
+    """Generate, build, load and query one corpus size; return its metrics.
+
+    Queries run as ``search_manual.py`` runs them by default, on BM25 alone.
+    With a ``reranker`` (default: the weights in ``experience/reranker.json``,
+    if any) the same queries reranked give the reranked quality and
+    ``rerank_p50_ms`` times ``SearchIndex.rerank`` alone on the same
+    candidates. Those numbers are in-sample when the weights were trained on
+    ``labeled``; ``heldout_comparison`` gives the held-out ones.
+    """
+    if reranker is None and DEFAULT_WEIGHTS_PATH.exists():
+        reranker = Reranker.load()
+    manual_root = workdir / f"corpus-{size}"
+    index_dir = workdir / f"index-{size}"
+    pages = generate_corpus(manual_root, size, seed=seed)
+
+    start = time.perf_counter()
+    stats = build_index(manual_root, index_dir, synonym_groups=synonym_groups)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SearchIndex.load(index_dir)
+    load_s = time.perf_counter() - start
+
+    latencies: list[float] = []
+    rerank_times: list[float] = []
+    recalls: list[float] = []
+    rrs: list[float] = []
+    rerank_recalls: list[float] = []
+    rerank_rrs: list[float] = []
+    for item in labeled:
+        intent = detect_intent(item["input"], profiles)
+        queries = build_queries(item["input"], intent)
+        hits: list[dict] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = index.search(queries, topk=topk)
+            latencies.append((time.perf_counter() - start) * 1000)
+        ranked = _hit_sources(hits)
+        recalls.append(recall_at_k(ranked, item["relevant"], topk))
+        rrs.append(reciprocal_rank(ranked, item["relevant"]))
+        if reranker is None:
+            continue
+        terms, scores, candidates = index.candidates(queries)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            index.rerank(candidates[:RERANK_CANDIDATES], scores, terms, intent, reranker)
+            rerank_times.append((time.perf_counter() - start) * 1000)
+        reranked_hits = index.search(queries, topk=topk, reranker=reranker, rerank=RERANK_CANDIDATES, intent=intent)
+        reranked = _hit_sources(reranked_hits)
+        rerank_recalls.append(recall_at_k(reranked, item["relevant"], topk))
+        rerank_rrs.append(reciprocal_rank(reranked, item["relevant"]))
+
+    result = {
+        "size": size,
+        "pages": pages,
+        "chunks": stats["chunks"],
+        "indexed_chunks": stats["indexed"],
+        "build_s": round(build_s, 3),
+        "index_bytes": _dir_bytes(index_dir),
+        "load_s": round(load_s, 3),
+        "first_query_ms": round(latencies[0], 3) if latencies else 0.0,
+        "query_p50_ms": round(percentile(latencies, 50), 3),
+        "query_p99_ms": round(percentile(latencies, 99), 3),
+        f"recall@{topk}": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        "mrr": round(sum(rrs) / len(rrs), 4) if rrs else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if reranker is not None:
+        result[f"rerank_recall@{topk}"] = round(sum(rerank_recalls) / len(rerank_recalls), 4) if rerank_recalls else 0.0
+        result["rerank_mrr"] = round(sum(rerank_rrs) / len(rerank_rrs), 4) if rerank_rrs else 0.0
+        result["rerank_p50_ms"] = round(percentile(rerank_times, 50), 3)
+    return result
+
+
+def compare_results(baseline: dict, current: dict) -> dict:
+    """Per-size relative change of every numeric metric between two runs."""
+    before = {r["size"]: r for r in baseline.get("results", [])}
+    report: dict[str, dict] = {}
+    for result in current.get("results", []):
+        old = before.get(result["size"])
+        if old is None:
+            continue
+        changes = {}
+        for key, value in result.items():
+            prev = old.get(key)
+            if key == "size" or not isinstance(value, (int, float)) or not isinstance(prev, (int, float)):
+                continue
+            change = round((value - prev) / prev * 100, 2) if prev else None
+            changes[key] = {"baseline": prev, "current": value, "change_pct": change}
+        report[str(result["size"])] = changes
+    return report
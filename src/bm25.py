@@ -3,26 +3,46 @@ from __future__ import annotations
 import math
 import re
 from collections import Counter
-from typing import Iterable
+from typing import Iterable, Mapping, Sequence
 
 
 _CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
 
 
 def tokenize(text: str) -> list[str]:
     text = text.lower()
-    tokens = re.findall(r"[a-z0-9]+|[\u4e00-\u9fff]", text)
+    tokens = _TOKEN_RE.findall(text)
     return tokens
 
 
+def token_spans(text: str) -> list[tuple[int, int]]:
+    """``(start, end)`` of each token of ``tokenize(text)``, in order."""
+    return [m.span() for m in _TOKEN_RE.finditer(text.lower())]
+
+
 class BM25Index:
-    def __init__(self, docs: list[list[str]], doc_freq: Counter, avgdl: float, k1: float = 1.5, b: float = 0.75):
+    def __init__(
+        self,
+        docs: list[list[str]],
+        doc_freq: Counter,
+        avgdl: float,
+        k1: float = 1.5,
+        b: float = 0.75,
+        expansions: dict[tuple[str, ...], list[tuple[str, float]]] | None = None,
+        sorted_terms: list[str] | None = None,
+    ):
         self.docs = docs
         self.doc_freq = doc_freq
         self.avgdl = avgdl
         self.k1 = k1
         self.b = b
         self.N = len(docs)
+        # Synonym phrase -> weighted index terms, compiled at build time.
+        self.expansions = expansions or {}
+        self._sorted_terms = sorted_terms
+        self._postings: dict[str, list[tuple[int, int]]] | None = None
+        self._doc_lens: list[int] | None = None
 
     @classmethod
     def build(cls, texts: Iterable[str]) -> "BM25Index":
@@ -34,19 +54,100 @@ class BM25Index:
         avgdl = (sum(len(doc) for doc in docs) / len(docs)) if docs else 0.0
         return cls(docs, doc_freq, avgdl)
 
-    def score(self, query: str) -> list[float]:
-        q_tokens = tokenize(query)
+    @property
+    def postings(self) -> dict[str, list[tuple[int, int]]]:
+        if self._postings is None:
+            postings: dict[str, list[tuple[int, int]]] = {}
+            for i, doc in enumerate(self.docs):
+                for term, tf in Counter(doc).items():
+                    postings.setdefault(term, []).append((i, tf))
+            self._postings = postings
+        return self._postings
+
+    @property
+    def sorted_terms(self) -> list[str]:
+        """The vocabulary in sorted order, for prefix and fuzzy term lookup."""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.doc_freq)
+        return self._sorted_terms
+
+    @property
+    def doc_lens(self) -> list[int]:
+        if self._doc_lens is None:
+            self._doc_lens = [len(doc) for doc in self.docs]
+        return self._doc_lens
+
+    def score(self, query: str, mask: bytes | bytearray | None = None) -> list[float]:
+        """Score every doc against ``query`` by walking the query terms' postings.
+
+        When ``mask`` is given, only docs with a non-zero mask byte are scored;
+        the rest keep a score of 0.
+        """
+        return self.score_terms(Counter(tokenize(query)), mask)
+
+    def score_terms(self, terms: Mapping[str, float], mask: bytes | bytearray | None = None) -> list[float]:
+        """Like ``score`` for a weighted query: each term's score is scaled by its weight."""
+        scores = [0.0 for _ in self.docs]
+        if not self.docs:
+            return scores
+        postings = self.postings
+        doc_lens = self.doc_lens
+        k1 = self.k1
+        base = k1 * (1 - self.b)
+        per_len = k1 * self.b / (self.avgdl or 1)
+        for term, weight in terms.items():
+            plist = postings.get(term)
+            if not plist:
+                continue
+            df = self.doc_freq.get(term, 0)
+            idf = weight * math.log(1 + (self.N - df + 0.5) / (df + 0.5))
+            for i, tf in plist:
+                if mask is not None and not mask[i]:
+                    continue
+                denom = tf + base + per_len * doc_lens[i]
+                scores[i] += idf * (tf * (k1 + 1) / denom)
+        return scores
+
+    def score_queries(
+        self,
+        queries: Sequence[Mapping[str, float]],
+        mask: bytes | bytearray | None = None,
+    ) -> list[float]:
+        """Score docs against several weighted queries; a doc keeps its best one.
+
+        Each query is scored as ``score_terms`` scores it, but the postings of
+        a term shared by several queries are walked once.
+        """
+        if len(queries) == 1:
+            return self.score_terms(queries[0], mask)
         scores = [0.0 for _ in self.docs]
         if not self.docs:
             return scores
-        for i, doc in enumerate(self.docs):
-            dl = len(doc)
-            tf = Counter(doc)
-            for term in q_tokens:
-                if term not in tf:
+        uses: dict[str, list[tuple[int, float]]] = {}
+        for q, terms in enumerate(queries):
+            for term, weight in terms.items():
+                uses.setdefault(term, []).append((q, weight))
+        per_query: list[dict[int, float]] = [{} for _ in queries]
+        postings = self.postings
+        doc_lens = self.doc_lens
+        k1 = self.k1
+        base = k1 * (1 - self.b)
+        per_len = k1 * self.b / (self.avgdl or 1)
+        for term, term_uses in uses.items():
+            plist = postings.get(term)
+            if not plist:
+                continue
+            df = self.doc_freq.get(term, 0)
+            idf = math.log(1 + (self.N - df + 0.5) / (df + 0.5))
+            for i, tf in plist:
+                if mask is not None and not mask[i]:
                     continue
-                df = self.doc_freq.get(term, 0)
-                idf = math.log(1 + (self.N - df + 0.5) / (df + 0.5))
-                denom = tf[term] + self.k1 * (1 - self.b + self.b * dl / (self.avgdl or 1))
-                scores[i] += idf * (tf[term] * (self.k1 + 1) / denom)
+                score = idf * (tf * (k1 + 1) / (tf + base + per_len * doc_lens[i]))
+                for q, weight in term_uses:
+                    acc = per_query[q]
+                    acc[i] = acc.get(i, 0.0) + weight * score
+        for acc in per_query:
+            for i, score in acc.items():
+                if score > scores[i]:
+                    scores[i] = score
         return scores
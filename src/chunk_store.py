@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+
+from src.devices import current_version_dir
+
+CHUNKS_FILE = "chunks.jsonl"
+CHUNKS_INDEX_FILE = "chunks.idx"
+
+# One (offset, length) record per numeric chunk id; offset -1 marks a gap.
+_RECORD = struct.Struct("<qq")
+
+
+def write_chunk_store(out_dir: Path, chunks: list[dict]) -> None:
+    """Write chunks as JSON lines plus a fixed-width offset table keyed by id.
+
+    Ids of collapsed duplicates point at their representative's record, so
+    a ref to any chunk id the index produced resolves.
+    """
+    spans: dict[int, tuple[int, int]] = {}
+    offset = 0
+    with (out_dir / CHUNKS_FILE).open("wb") as f:
+        for chunk in chunks:
+            line = json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            span = (offset, len(line) - 1)
+            spans[int(chunk["chunk_id"])] = span
+            for dup in chunk.get("duplicates", []):
+                spans[int(dup["chunk_id"])] = span
+            offset += len(line)
+
+    table = bytearray(_RECORD.size * (max(spans) + 1 if spans else 0))
+    for n in range(len(table) // _RECORD.size):
+        _RECORD.pack_into(table, n * _RECORD.size, *spans.get(n, (-1, 0)))
+    (out_dir / CHUNKS_INDEX_FILE).write_bytes(bytes(table))
+
+
+def _map(path: Path) -> mmap.mmap | bytes:
+    with path.open("rb") as f:
+        if path.stat().st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """Random access to an index's chunks by ``chunk_id``.
+
+    Both files are memory-mapped, so opening the store is O(1) and a lookup
+    touches only the record it needs. ``index_dir`` may be a versioned index
+    root; the store then opens its current version. Indexes built before the
+    store existed fall back to a dict over ``meta.json``.
+    """
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = index_dir
+        self.version_dir = current_version_dir(index_dir)
+        self._meta: dict[str, dict] | None = None
+        data_path = self.version_dir / CHUNKS_FILE
+        table_path = self.version_dir / CHUNKS_INDEX_FILE
+        if data_path.exists() and table_path.exists():
+            self._data = _map(data_path)
+            self._table = _map(table_path)
+        else:
+            meta = json.loads((self.version_dir / "meta.json").read_text(encoding="utf-8"))
+            self._meta = {}
+            for chunk in meta:
+                self._meta[chunk.get("chunk_id")] = chunk
+                for dup in chunk.get("duplicates", []):
+                    self._meta.setdefault(dup.get("chunk_id"), chunk)
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        index_dir = current_version_dir(index_dir)
+        return (index_dir / CHUNKS_FILE).exists() or (index_dir / "meta.json").exists()
+
+    def get(self, chunk_id: str) -> dict | None:
+        if self._meta is not None:
+            return self._meta.get(chunk_id)
+        try:
+            n = int(chunk_id)
+        except (TypeError, ValueError):
+            return None
+        if n < 0 or (n + 1) * _RECORD.size > len(self._table):
+            return None
+        offset, length = _RECORD.unpack_from(self._table, n * _RECORD.size)
+        if offset < 0:
+            return None
+        return json.loads(self._data[offset:offset + length])
+
+    def close(self) -> None:
+        for mapped in (getattr(self, "_data", None), getattr(self, "_table", None)):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+    def __enter__(self) -> "ChunkStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
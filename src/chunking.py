@@ -21,6 +21,7 @@ def chunk_markdown(text: str, source: str, max_chars: int = 800, overlap: int =
     lines = text.splitlines()
     title = ""
     section = ""
+    headings: list[tuple[int, str]] = []
     buffer: list[str] = []
     chunks: list[dict] = []
 
@@ -35,7 +36,9 @@ def chunk_markdown(text: str, source: str, max_chars: int = 800, overlap: int =
                 "source": source,
                 "title": title or section or source,
                 "section": section or title or source,
+                "headings": [heading for _, heading in headings],
                 "text": part.strip(),
+                "has_cli": "```" in part,
             })
 
     for line in lines:
@@ -43,6 +46,9 @@ def chunk_markdown(text: str, source: str, max_chars: int = 800, overlap: int =
             flush_buffer()
             heading = line.lstrip("#").strip()
             level = len(line) - len(line.lstrip("#"))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, heading))
             if level == 1:
                 title = heading
                 section = heading
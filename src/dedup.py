@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Any, Callable
+
+from src.bm25 import tokenize
+from src.filters import DOC_TYPES
+
+# Which copy of a duplicate group is indexed: configuration guides first,
+# then command references, then alarms, then anything else.
+_DOC_TYPE_ORDER = {root: rank for rank, root in enumerate(DOC_TYPES.values())}
+
+SIMHASH_BITS = 64
+# SimHash only proposes a fold; the two chunks must also share this much of
+# their shingles and run the same commands in their code blocks.
+MIN_JACCARD = 0.9
+
+_FENCE_RE = re.compile(r"```(.*?)(?:```|$)", re.S)
+
+# _BIT_TABLES[bit] maps a byte value to 1 when that bit is set, so bit counts
+# over a column of digest bytes can be taken with bytes.translate/count.
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def _shingles(tokens: list[str], size: int) -> list[str]:
+    if len(tokens) <= size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def simhash(tokens: list[str], shingle_size: int = 3) -> int:
+    shingles = _shingles(tokens, shingle_size)
+    if not shingles:
+        return 0
+    digests = b"".join(
+        hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles
+    )
+    half = len(shingles) / 2
+    value = 0
+    for byte_pos in range(8):
+        column = digests[byte_pos::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) > half:
+                value |= 1 << (byte_pos * 8 + bit)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def cluster_fingerprints(
+    fingerprints: list[int],
+    max_distance: int = 3,
+    confirm: Callable[[int, int], bool] | None = None,
+) -> list[int]:
+    """Map every fingerprint to the index of its cluster representative.
+
+    Fingerprints are split into ``max_distance + 1`` bands; two fingerprints
+    within ``max_distance`` bits must agree on at least one band, so only
+    fingerprints sharing a band are compared. With ``confirm``, a candidate
+    within distance is only taken when ``confirm(i, candidate)`` holds.
+    """
+    bands = max_distance + 1
+    width = SIMHASH_BITS // bands
+    mask = (1 << width) - 1
+    buckets: dict[tuple[int, int], list[int]] = {}
+    representatives: list[int] = []
+    for i, fp in enumerate(fingerprints):
+        keys = [(band, (fp >> (band * width)) & mask) for band in range(bands)]
+        rep = i
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                if hamming(fp, fingerprints[candidate]) <= max_distance and (
+                    confirm is None or confirm(i, candidate)
+                ):
+                    rep = candidate
+                    break
+            if rep != i:
+                break
+        representatives.append(rep)
+        if rep == i:
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+    return representatives
+
+
+def fence_tokens(text: str) -> list[str]:
+    """Tokens inside the Markdown code fences of ``text``, in order."""
+    return [token for block in _FENCE_RE.findall(text) for token in tokenize(block)]
+
+
+def same_content(a_tokens: list[str], b_tokens: list[str], a_text: str, b_text: str) -> bool:
+    """Whether two chunks SimHash put close together really are duplicates:
+    shingle Jaccard of at least ``MIN_JACCARD`` and identical commands."""
+    if fence_tokens(a_text) != fence_tokens(b_text):
+        return False
+    a, b = set(_shingles(a_tokens, 3)), set(_shingles(b_tokens, 3))
+    return bool(a | b) and len(a & b) / len(a | b) >= MIN_JACCARD
+
+
+def dedup_chunks(chunks: list[dict], max_distance: int = 3, min_tokens: int = 10) -> list[dict]:
+    """Collapse near-duplicate chunks into one copy per group.
+
+    The kept copy is chosen by ``_keep_rank`` (document type, then path
+    depth, then position), so it does not depend on the walk order. SimHash
+    within ``max_distance`` bits only proposes a fold; ``same_content`` must
+    confirm it. Each kept chunk gets a ``simhash`` and a ``duplicates`` list
+    with the ``chunk_id``/``source``/``section`` of every chunk folded into
+    it. Chunks shorter than ``min_tokens`` are only collapsed on an exact
+    token match, since their fingerprints are too noisy to compare by
+    distance.
+    """
+    token_lists = [tokenize(c["text"]) for c in chunks]
+    fingerprints = [simhash(tokens) for tokens in token_lists]
+
+    long_ids = [i for i, tokens in enumerate(token_lists) if len(tokens) >= min_tokens]
+
+    def _confirm(pos: int, other: int) -> bool:
+        a, b = long_ids[pos], long_ids[other]
+        return same_content(token_lists[a], token_lists[b], chunks[a]["text"], chunks[b]["text"])
+
+    long_reps = cluster_fingerprints([fingerprints[i] for i in long_ids], max_distance, _confirm)
+    representative = list(range(len(chunks)))
+    for pos, i in enumerate(long_ids):
+        representative[i] = long_ids[long_reps[pos]]
+
+    exact: dict[tuple[str, ...], int] = {}
+    for i, tokens in enumerate(token_lists):
+        if len(tokens) < min_tokens:
+            representative[i] = exact.setdefault(tuple(tokens), i)
+
+    best: dict[int, int] = {}
+    for i, rep in enumerate(representative):
+        if rep not in best or _keep_rank(chunks[i], i) < _keep_rank(chunks[best[rep]], best[rep]):
+            best[rep] = i
+    representative = [best[rep] for rep in representative]
+
+    kept: list[dict] = []
+    by_index: dict[int, dict] = {}
+    for i, chunk in enumerate(chunks):
+        rep = representative[i]
+        if rep == i:
+            chunk["simhash"] = f"{fingerprints[i]:016x}"
+            chunk["duplicates"] = []
+            by_index[i] = chunk
+            kept.append(chunk)
+    for i, chunk in enumerate(chunks):
+        rep = representative[i]
+        if rep != i:
+            by_index[rep]["duplicates"].append(source_ref(chunk))
+    return kept
+
+
+def _keep_rank(chunk: dict, position: int) -> tuple[int, int, int]:
+    source = (chunk.get("source") or "").replace("\\", "/")
+    doc_type = _DOC_TYPE_ORDER.get(source.split("/", 1)[0], len(_DOC_TYPE_ORDER))
+    return doc_type, source.count("/"), position
+
+
+def source_ref(chunk: dict) -> dict:
+    """What a ``duplicates`` entry records of a folded chunk."""
+    return {
+        "chunk_id": chunk.get("chunk_id"),
+        "source": chunk.get("source"),
+        "section": chunk.get("section"),
+        "title": chunk.get("title"),
+    }
+
+
+def collapse_hits(ranked: list[int], meta: list[dict], topk: int, max_distance: int = 3) -> list[tuple[int, list[dict]]]:
+    """Walk ranked chunk indices and fold near-duplicate hits together.
+
+    Returns up to ``topk`` ``(index, duplicates)`` pairs, where ``duplicates``
+    holds the index-time duplicates of the hit plus any lower-ranked hits that
+    collapsed into it. As at index time, a fold SimHash proposes must pass
+    ``same_content``.
+    """
+    kept: list[tuple[int, int, list[dict]]] = []
+    for i in ranked:
+        chunk = meta[i]
+        fp = _fingerprint(chunk)
+        for j, kept_fp, duplicates in kept:
+            if hamming(fp, kept_fp) <= max_distance and _same_chunk(chunk, meta[j]):
+                duplicates.append(source_ref(chunk))
+                duplicates.extend(chunk.get("duplicates", []))
+                break
+        else:
+            if len(kept) >= topk:
+                break
+            kept.append((i, fp, list(chunk.get("duplicates", []))))
+    return [(i, duplicates) for i, _, duplicates in kept]
+
+
+def _same_chunk(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    a_text, b_text = a.get("text", ""), b.get("text", "")
+    return same_content(tokenize(a_text), tokenize(b_text), a_text, b_text)
+
+
+def _fingerprint(chunk: dict[str, Any]) -> int:
+    value = chunk.get("simhash")
+    if value:
+        return int(value, 16)
+    return simhash(tokenize(chunk.get("text", "")))
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+CURRENT_POINTER = "current"
+VERSIONS_DIR = "versions"
+
+
+def normalize_device(device: str | None) -> str | None:
+    if not device:
+        return None
+    value = device.strip().lower()
+    if "-v" in value and value.rsplit("-v", 1)[1].isdigit():
+        return value.rsplit("-v", 1)[0]
+    return value
+
+
+def resolve_index_dir(root: Path, device: str, index_override: str | None = None) -> Path:
+    if index_override:
+        return Path(index_override).expanduser().resolve()
+    preferred = root / "data" / device
+    if preferred.exists():
+        return preferred
+
+    # Backward compatibility with legacy "<device>-v<version>" index folders.
+    for path in (root / "data").glob(f"{device}-v*"):
+        if path.is_dir():
+            return path
+    return preferred
+
+
+def current_version_dir(index_dir: Path) -> Path:
+    """Directory holding the live files of ``index_dir``.
+
+    Versioned indexes name their live version in the ``current`` pointer
+    file; indexes written before versioning keep their files in place.
+    """
+    try:
+        version = (index_dir / CURRENT_POINTER).read_text(encoding="utf-8").strip()
+    except OSError:
+        return index_dir
+    return index_dir / VERSIONS_DIR / version if version else index_dir
+
+
+def index_exists(index_dir: Path) -> bool:
+    live = current_version_dir(index_dir)
+    return (live / "meta.json").exists() and (live / "bm25.pkl").exists()
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import json
+import os
 import re
 from pathlib import Path
 from typing import Any
 
-import yaml
+PROFILE_CACHE_VERSION = 1
+CACHE_DIR_ENV = "HUAWEI_RAG_CACHE_DIR"
 
 
 def _norm(text: str) -> str:
@@ -12,6 +15,8 @@ def _norm(text: str) -> str:
 
 
 def load_protocol_profiles(base_dir: Path) -> dict[str, dict[str, Any]]:
+    import yaml
+
     profiles: dict[str, dict[str, Any]] = {}
     for path in sorted(base_dir.glob("*.yaml")):
         data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
@@ -22,6 +27,51 @@ def load_protocol_profiles(base_dir: Path) -> dict[str, dict[str, Any]]:
     return profiles
 
 
+def _profiles_signature(base_dir: Path) -> list[list]:
+    if not base_dir.is_dir():
+        return []
+    signature = []
+    for entry in sorted(os.scandir(base_dir), key=lambda e: e.name):
+        if entry.name.endswith(".yaml") and entry.is_file():
+            stat = entry.stat()
+            signature.append([entry.name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def profile_cache_path(root: Path) -> Path:
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    base = Path(cache_dir).expanduser() if cache_dir else root / "data" / ".cache"
+    return base / "protocol_profiles.json"
+
+
+def load_protocol_profiles_cached(base_dir: Path, cache_path: Path) -> dict[str, dict[str, Any]]:
+    """``load_protocol_profiles`` backed by a precompiled JSON cache.
+
+    The cache is keyed on the name, mtime and size of every profile YAML, so
+    a warm start only stats the directory and parses JSON; PyYAML is imported
+    only when a profile changed.
+    """
+    signature = _profiles_signature(base_dir)
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("version") == PROFILE_CACHE_VERSION and cached.get("signature") == signature:
+            return cached["profiles"]
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+
+    profiles = load_protocol_profiles(base_dir)
+    payload = {"version": PROFILE_CACHE_VERSION, "signature": signature, "profiles": profiles}
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        # A read-only checkout or non-JSON YAML values just mean no cache.
+        pass
+    return profiles
+
+
 def detect_intent(text: str, profiles: dict[str, dict[str, Any]]) -> dict[str, Any]:
     norm_text = _norm(text)
     selected_protocol = None
@@ -64,3 +114,18 @@ def detect_intent(text: str, profiles: dict[str, dict[str, Any]]) -> dict[str, A
         "placeholder_fields": placeholder_fields,
         "profile": selected_profile,
     }
+
+
+def load_synonym_groups(base_dir: Path) -> list[dict[str, Any]]:
+    """Synonym groups from every ``*.yaml`` under ``base_dir``, in file order."""
+    if not base_dir.is_dir():
+        return []
+    import yaml
+
+    groups: list[dict[str, Any]] = []
+    for path in sorted(base_dir.glob("*.yaml")):
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        for group in data.get("groups", []):
+            if group.get("terms"):
+                groups.append(group)
+    return groups
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Manual subtrees by their top-level directory; ``type=<alias>`` filters on it.
+DOC_TYPES = {
+    "config": "配置指南",
+    "command": "命令参考",
+    "alarm": "告警处理",
+}
+FILTER_KEYS = ("source", "section", "type")
+
+
+def parse_filters(items: list[str] | None) -> dict[str, list[str]]:
+    """Parse ``key=value`` filters; repeated keys OR together, keys AND together."""
+    filters: dict[str, list[str]] = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        key = key.strip().lower()
+        value = value.strip()
+        if not sep or not value:
+            raise ValueError(f"filter must be key=value: {item!r}")
+        if key not in FILTER_KEYS:
+            raise ValueError(f"unknown filter key {key!r} (expected one of: {', '.join(FILTER_KEYS)})")
+        filters.setdefault(key, []).append(value)
+    return filters
+
+
+def _source_prefixes(filters: dict[str, list[str]]) -> list[str] | None:
+    """Source-prefix and type filters, both as prefixes of ``source``."""
+    if "source" not in filters and "type" not in filters:
+        return None
+    type_prefixes = [DOC_TYPES.get(t.lower(), t).rstrip("/") + "/" for t in filters.get("type", [])]
+    source_prefixes = [p.replace("\\", "/") for p in filters.get("source", [])]
+    if type_prefixes and source_prefixes:
+        # Both given: a source prefix only counts inside one of the types.
+        return [p for p in source_prefixes if any(p.startswith(t) for t in type_prefixes)]
+    return type_prefixes or source_prefixes
+
+
+def heading_postings(sections: list[dict]) -> dict[str, list[int]]:
+    """Token -> ids of the ``sections`` whose ``section`` name has it."""
+    # Imported here: search_manual.py parses filters on its fast path,
+    # before any index module is loaded.
+    from src.bm25 import tokenize
+
+    postings: dict[str, list[int]] = {}
+    for sid, section in enumerate(sections):
+        for term in set(tokenize(section.get("section") or "")):
+            postings.setdefault(term, []).append(sid)
+    return postings
+
+
+def _name_candidates(names: list[str], postings: dict[str, list[int]]) -> set[int] | None:
+    """Sections whose name has every token of one of ``names``, a superset
+    of those containing it; ``None`` when a name has no tokens."""
+    from src.bm25 import tokenize
+
+    candidates: set[int] = set()
+    for name in names:
+        tokens = set(tokenize(name))
+        if not tokens:
+            return None
+        found: set[int] | None = None
+        for token in tokens:
+            if token.isascii():
+                # A partial keyword matches inside longer name tokens.
+                sids = {sid for term, ids in postings.items() if token in term for sid in ids}
+            else:
+                sids = set(postings.get(token, ()))
+            found = sids if found is None else found & sids
+            if not found:
+                break
+        candidates |= found or set()
+    return candidates
+
+
+def section_filter_mask(
+    sections: list[dict],
+    filters: dict[str, list[str]],
+    sorted_sources: list[str] | None = None,
+    headings: dict[str, list[int]] | None = None,
+) -> bytearray:
+    """Byte mask over ``sections`` of those passing ``filters``.
+
+    With ``sorted_sources`` (the sections' sources, in order and sorted), a
+    source prefix selects one contiguous run found by bisection instead of a
+    scan over every section. With ``headings`` (from ``heading_postings``),
+    a section name is only checked against the sections whose headings
+    share its tokens.
+    """
+    allowed = bytearray(b"\x01" * len(sections))
+    prefixes = _source_prefixes(filters)
+    if prefixes is not None:
+        allowed = bytearray(len(sections))
+        for prefix in prefixes:
+            if sorted_sources is not None:
+                lo = bisect_left(sorted_sources, prefix)
+                hi = bisect_left(sorted_sources, prefix + "\U0010ffff", lo)
+                allowed[lo:hi] = b"\x01" * (hi - lo)
+                continue
+            for sid, section in enumerate(sections):
+                if (section.get("source") or "").replace("\\", "/").startswith(prefix):
+                    allowed[sid] = 1
+
+    names = [n.lower() for n in filters.get("section", [])]
+    if not names:
+        return allowed
+    candidates = _name_candidates(names, headings) if headings is not None else None
+    narrowed = bytearray(len(sections))
+    for sid in range(len(sections)) if candidates is None else candidates:
+        heading = (sections[sid].get("section") or "").lower()
+        if allowed[sid] and any(n in heading for n in names):
+            narrowed[sid] = 1
+    return narrowed
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from src.bm25 import tokenize
+from src.chunk_store import ChunkStore
+from src.devices import current_version_dir, normalize_device, resolve_index_dir
+
+_PLACEHOLDER_RE = re.compile(r"<[^>]*>")
+# Interface and instance names carry user-chosen numbers
+# (GigabitEthernet0/0/2, Vlanif100, LoopBack0); only the stem is a keyword.
+_NUMBERED_RE = re.compile(r"([a-z]{2,})\d+")
+
+
+def command_keywords(cmd: str) -> list[str]:
+    """CLI keywords of ``cmd``: placeholders, numeric values and the numbers
+    of interface-style names dropped."""
+    keywords = []
+    for token in tokenize(_PLACEHOLDER_RE.sub(" ", cmd)):
+        if token.isdigit():
+            continue
+        numbered = _NUMBERED_RE.fullmatch(token)
+        keywords.append(numbered.group(1) if numbered else token)
+    return keywords
+
+
+def keyword_coverage(keywords: list[str], text_tokens: set[str]) -> float:
+    """Share of ``keywords`` found in the text, allowing abbreviated keywords.
+
+    VRP accepts unambiguous keyword prefixes (``int`` for ``interface``), so
+    a keyword also counts when it is a prefix of a token of the text.
+    """
+    if not keywords:
+        return 1.0
+    found = 0
+    for keyword in keywords:
+        if keyword in text_tokens or any(t.startswith(keyword) for t in text_tokens):
+            found += 1
+    return found / len(keywords)
+
+
+def check_grounding(plan: dict[str, Any], store: ChunkStore, threshold: float = 0.8) -> dict:
+    """Check every command of ``plan`` against the chunks its refs cite.
+
+    A command is grounded when at least ``threshold`` of its keywords occur in
+    one of its referenced chunks. Returns the commands that are ungrounded or
+    cite ref ids missing from the index, and the time the check took.
+    """
+    start = time.perf_counter()
+    token_cache: dict[str, set[str] | None] = {}
+    issues = []
+    for idx, cmd in enumerate(plan.get("commands", [])):
+        if not isinstance(cmd, dict):
+            continue
+        refs = cmd.get("refs", [])
+        if not refs:
+            continue
+        cmd_text = cmd.get("cmd", "")
+        keywords = command_keywords(cmd_text)
+        best = 0.0
+        missing_refs = []
+        for ref in refs:
+            ref = str(ref)
+            if ref not in token_cache:
+                chunk = store.get(ref)
+                token_cache[ref] = set(tokenize(chunk.get("text", ""))) if chunk else None
+            tokens = token_cache[ref]
+            if tokens is None:
+                missing_refs.append(ref)
+                continue
+            best = max(best, keyword_coverage(keywords, tokens))
+        if best < threshold or missing_refs:
+            issues.append({
+                "index": idx,
+                "cmd": cmd_text,
+                "refs": refs,
+                "missing_refs": missing_refs,
+                "grounded": best >= threshold,
+                "score": round(best, 3),
+            })
+    return {"issues": issues, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def grounding_errors(report: dict) -> list[str]:
+    errors = []
+    for item in report["issues"]:
+        if item["missing_refs"]:
+            errors.append(f"commands[{item['index']}].refs 在索引中不存在: {', '.join(item['missing_refs'])}")
+        if not item["grounded"]:
+            errors.append(f"命令未在引用片段中找到依据: commands[{item['index']}] '{item['cmd']}'")
+    return errors
+
+
+class GroundingChecker:
+    """Grounding checks for plans, with one chunk store per index version.
+
+    Stores are opened on first use and shared across threads. They are keyed
+    by the live version directory, so a newly published index version gets
+    a fresh store while checks still running finish on the old one. A store
+    whose version is no longer live is closed once its last check returns,
+    so ``prune_versions`` can reclaim the files.
+    """
+
+    def __init__(self, root: Path, index_override: str | None = None):
+        self.root = root
+        self.index_override = index_override
+        self._stores: dict[Path, ChunkStore] = {}
+        self._users: dict[Path, int] = {}
+        # Index directory -> the version its checks last opened.
+        self._live: dict[Path, Path] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, index_dir: Path) -> tuple[Path, ChunkStore]:
+        version = current_version_dir(index_dir)
+        with self._lock:
+            previous = self._live.get(index_dir)
+            self._live[index_dir] = version
+            if previous is not None and previous != version:
+                self._close_if_idle(previous)
+            store = self._stores.get(version)
+            if store is None:
+                store = self._stores[version] = ChunkStore(version)
+            self._users[version] = self._users.get(version, 0) + 1
+            return version, store
+
+    def _release(self, version: Path) -> None:
+        with self._lock:
+            self._users[version] -= 1
+            self._close_if_idle(version)
+
+    def _close_if_idle(self, version: Path) -> None:
+        # Called with the lock held.
+        if self._users.get(version, 0) or version in self._live.values():
+            return
+        self._users.pop(version, None)
+        store = self._stores.pop(version, None)
+        if store is not None:
+            store.close()
+
+    def evict(self) -> None:
+        """Close the stores of index directories that published a new version."""
+        with self._lock:
+            live = list(self._live.items())
+        for index_dir, version in live:
+            current = current_version_dir(index_dir)
+            if current == version:
+                continue
+            with self._lock:
+                if self._live.get(index_dir) == version:
+                    del self._live[index_dir]
+                    self._close_if_idle(version)
+
+    def check(self, plan: dict, index_override: str | None = None) -> tuple[list[str], dict | None]:
+        """Return grounding errors for ``plan`` and the report, if one ran."""
+        if not isinstance(plan, dict):
+            return ["无法进行依据校验: 计划必须是 JSON 对象"], None
+        override = index_override or self.index_override
+        device = normalize_device(plan.get("device")) if isinstance(plan.get("device"), str) else None
+        if not override and not device:
+            return ["无法进行依据校验: 计划缺少 device，且未指定 --index"], None
+        index_dir = resolve_index_dir(self.root, device or "", override)
+        if not ChunkStore.exists(index_dir):
+            return [f"无法进行依据校验: 索引不存在 {index_dir}"], None
+        version, store = self._acquire(index_dir)
+        try:
+            report = check_grounding(plan, store)
+        finally:
+            self._release(version)
+        return grounding_errors(report), report
+
+    def close(self) -> None:
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
+            self._users.clear()
+            self._live.clear()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import shutil
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+from src.bm25 import BM25Index, tokenize
+from src.chunk_store import write_chunk_store
+from src.chunking import chunk_markdown
+from src.dedup import dedup_chunks
+from src.devices import CURRENT_POINTER, VERSIONS_DIR
+from src.profiling import phase
+from src.snippets import write_offsets
+from src.synonyms import compile_synonyms
+
+# Source -> chunk ids of the page in order, taken before deduplication.
+PAGES_FILE = "pages.json"
+
+
+def collect_chunks(manual_root: Path, max_chars: int = 800, overlap: int = 100) -> list[dict]:
+    chunks = []
+    chunk_id = 0
+    # Sorted by path, so every directory subtree is a contiguous chunk range.
+    for md_path in sorted(manual_root.rglob("*.md"), key=lambda p: p.relative_to(manual_root).as_posix()):
+        text = md_path.read_text(encoding="utf-8", errors="ignore")
+        for chunk in chunk_markdown(
+            text,
+            source=md_path.relative_to(manual_root).as_posix(),
+            max_chars=max_chars,
+            overlap=overlap,
+        ):
+            chunk_id += 1
+            chunk["chunk_id"] = f"{chunk_id:06d}"
+            chunks.append(chunk)
+    return chunks
+
+
+def page_chunk_ids(chunks: list[dict]) -> dict[str, list[str]]:
+    """Chunk ids of every source page, in page order."""
+    pages: dict[str, list[str]] = {}
+    for chunk in chunks:
+        pages.setdefault(chunk.get("source") or "", []).append(chunk["chunk_id"])
+    return pages
+
+
+def save_bm25(bm25: BM25Index, path: Path) -> None:
+    with path.open("wb") as f:
+        pickle.dump(
+            {
+                "docs": bm25.docs,
+                "doc_freq": dict(bm25.doc_freq),
+                "avgdl": bm25.avgdl,
+                "k1": bm25.k1,
+                "b": bm25.b,
+                "expansions": bm25.expansions,
+                "terms": bm25.sorted_terms,
+            },
+            f,
+        )
+
+
+def load_bm25(path: Path) -> BM25Index:
+    data = pickle.loads(path.read_bytes())
+    return BM25Index(
+        docs=data["docs"],
+        doc_freq=Counter(data["doc_freq"]),
+        avgdl=data["avgdl"],
+        k1=data.get("k1", 1.5),
+        b=data.get("b", 0.75),
+        expansions=data.get("expansions"),
+        sorted_terms=data.get("terms"),
+    )
+
+
+def build_sections(chunks: list[dict]) -> list[dict]:
+    """Group consecutive chunks of one page and heading path into sections.
+
+    Chunks keep their page order, so every section is the contiguous chunk
+    range ``[start, end)`` and ``page`` is the chunk range of its whole source
+    page; ``heading_terms`` are the heading path's tokens, for reranking.
+    Each chunk gets the ``section_id`` it belongs to.
+    """
+    sections: list[dict] = []
+    previous = None
+    for i, chunk in enumerate(chunks):
+        key = (chunk.get("source"), tuple(chunk.get("headings", [])))
+        if key != previous:
+            sections.append({
+                "section_id": len(sections),
+                "source": chunk.get("source"),
+                "section": chunk.get("section"),
+                "title": chunk.get("title"),
+                "headings": list(chunk.get("headings", [])),
+                "heading_terms": sorted(set(tokenize(" ".join(chunk.get("headings", []))))),
+                "start": i,
+                "end": i,
+            })
+            previous = key
+        sections[-1]["end"] = i + 1
+        chunk["section_id"] = sections[-1]["section_id"]
+
+    page_first = 0
+    for sid in range(1, len(sections) + 1):
+        if sid == len(sections) or sections[sid]["source"] != sections[page_first]["source"]:
+            page = [sections[page_first]["start"], sections[sid - 1]["end"]]
+            for page_section in sections[page_first:sid]:
+                page_section["page"] = page
+            page_first = sid
+    return sections
+
+
+def _section_text(section: dict, chunks: list[dict]) -> str:
+    parts = list(section["headings"])
+    parts.extend(c["text"] for c in chunks[section["start"]:section["end"]])
+    return "\n".join(parts)
+
+
+def new_version_name(now_ns: int | None = None) -> str:
+    # One UTC clock reading, so names sort chronologically across second
+    # boundaries and DST changes; ``prune_versions`` relies on that order.
+    now_ns = time.time_ns() if now_ns is None else now_ns
+    seconds, nanos = divmod(now_ns, 1_000_000_000)
+    return time.strftime("%Y%m%d-%H%M%S", time.gmtime(seconds)) + f"-{nanos:09d}"
+
+
+def publish_version(out_dir: Path, version: str) -> None:
+    """Point ``out_dir/current`` at ``version`` with one atomic rename."""
+    tmp_path = out_dir / f"{CURRENT_POINTER}.{os.getpid()}.tmp"
+    tmp_path.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp_path, out_dir / CURRENT_POINTER)
+
+
+def prune_versions(out_dir: Path, keep: int) -> list[str]:
+    """Delete all but the newest ``keep`` versions, never the current one.
+
+    The previous version is kept by default so a reader that resolved the
+    pointer just before a publish can still open its files.
+    """
+    versions_dir = out_dir / VERSIONS_DIR
+    if not versions_dir.is_dir():
+        return []
+    current = (out_dir / CURRENT_POINTER).read_text(encoding="utf-8").strip()
+    names = sorted((p.name for p in versions_dir.iterdir() if p.is_dir()), reverse=True)
+    removed = []
+    for name in names[max(keep, 1):]:
+        if name == current:
+            continue
+        shutil.rmtree(versions_dir / name, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def build_index(
+    manual_root: Path,
+    out_dir: Path,
+    max_chars: int = 800,
+    overlap: int = 100,
+    dedup_distance: int | None = 3,
+    keep_versions: int = 2,
+    synonym_groups: list[dict[str, Any]] | None = None,
+) -> dict:
+    """Chunk every Markdown file under ``manual_root`` and write the index.
+
+    With ``dedup_distance`` set, near-duplicate chunks (SimHash within that
+    many bits, confirmed by ``src.dedup.same_content``) are collapsed into
+    one indexed representative that lists the other sources; every page's
+    full chunk order is kept in ``PAGES_FILE`` for context windows. Chunks
+    are also grouped into heading sections with their own BM25 index so
+    searches can rank sections before chunks.
+    ``synonym_groups`` (see ``experience/synonyms``) are compiled against the
+    chunk vocabulary and stored with the chunk BM25 index.
+
+    Files go to a fresh ``versions/<version>`` directory that becomes live
+    only when the ``current`` pointer is swapped, so concurrent readers never
+    see a half-written index. Returns chunk counts and the new version.
+    """
+    version = new_version_name()
+    version_dir = out_dir / VERSIONS_DIR / version
+    version_dir.mkdir(parents=True)
+
+    with phase("chunk"):
+        chunks = collect_chunks(manual_root, max_chars, overlap)
+        pages = page_chunk_ids(chunks)
+    total = len(chunks)
+    if dedup_distance is not None:
+        with phase("dedup"):
+            chunks = dedup_chunks(chunks, max_distance=dedup_distance)
+
+    with phase("sections"):
+        sections = build_sections(chunks)
+
+    with phase("bm25_build"):
+        texts = [c["text"] for c in chunks]
+        bm25 = BM25Index.build(texts)
+        if synonym_groups:
+            bm25.expansions = compile_synonyms(synonym_groups, bm25.doc_freq)
+        section_bm25 = BM25Index.build(_section_text(s, chunks) for s in sections)
+
+    with phase("write"):
+        meta_path = version_dir / "meta.json"
+        meta_path.write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
+        save_bm25(bm25, version_dir / "bm25.pkl")
+        write_chunk_store(version_dir, chunks)
+        write_offsets(version_dir, texts)
+        (version_dir / PAGES_FILE).write_text(json.dumps(pages, ensure_ascii=False), encoding="utf-8")
+
+        sections_path = version_dir / "sections.json"
+        sections_path.write_text(json.dumps(sections, ensure_ascii=False, indent=2), encoding="utf-8")
+        save_bm25(section_bm25, version_dir / "sections_bm25.pkl")
+
+    with phase("publish"):
+        publish_version(out_dir, version)
+        prune_versions(out_dir, keep_versions)
+
+    return {
+        "chunks": total,
+        "indexed": len(chunks),
+        "duplicates": total - len(chunks),
+        "version": version,
+    }
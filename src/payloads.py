@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+# Payloads printed by search_manual.py and returned by src.api.ManualSearcher.
+# Kept free of third-party imports so the CLI's early exits stay cheap.
+
+
+def build_queries(raw_input: str, intent: dict, query: str | None = None) -> list[str]:
+    if query:
+        return [query]
+    profile = intent.get("profile") or {}
+    return [raw_input] + list(profile.get("search_queries", []))
+
+
+def missing_index_payload(root: Path, raw_input: str, intent: dict, device: str, index_dir: Path) -> dict:
+    manual_root = root / "manuals" / device
+    md_dir = manual_root / "md"
+    return {
+        "status": "missing_index",
+        "experience_policy": "user_managed_only",
+        "can_generate_config": False,
+        "must_stop": True,
+        "next_action": "ask_user_for_manual_source_path",
+        "message": "索引缺失，先向用户索要手册路径并完成建库，禁止直接生成配置命令。",
+        "error": f"Index not found in {index_dir}",
+        "input": raw_input,
+        "protocol": intent.get("protocol"),
+        "packet": intent.get("packet"),
+        "device": device,
+        "required_fields": intent.get("required_fields", []),
+        "placeholder_fields": [],
+        "deferred_placeholder_fields": intent.get("placeholder_fields", []),
+        "hits": [],
+        "needs_user_input": [
+            "manual_source_path: 手册路径（CHM 文件、HTML 目录或 Markdown 目录）",
+        ],
+        "suggested_commands": {
+            "from_markdown": f"python scripts/build_index.py --manual <markdown_dir> --out {index_dir}",
+            "from_html": (
+                f"python scripts/html_to_md.py --input <html_dir> --out {md_dir} && "
+                f"python scripts/build_index.py --manual {md_dir} --out {index_dir}"
+            ),
+            "from_chm": f"python scripts/chm_to_index.py --input <manual.chm> --device {device} --index-out {index_dir}",
+        },
+    }
+
+
+def missing_device_payload(raw_input: str, intent: dict) -> dict:
+    return {
+        "status": "missing_device",
+        "experience_policy": "user_managed_only",
+        "can_generate_config": False,
+        "must_stop": True,
+        "next_action": "ask_user_for_device",
+        "message": "未提供设备类型，先让用户指定 device（ne/ce/ae/lsw/usg）后再检索。",
+        "input": raw_input,
+        "protocol": intent.get("protocol"),
+        "packet": intent.get("packet"),
+        "device": None,
+        "required_fields": intent.get("required_fields", []),
+        "placeholder_fields": [],
+        "deferred_placeholder_fields": intent.get("placeholder_fields", []),
+        "hits": [],
+        "needs_user_input": [
+            "device: ne | ce | ae | lsw | usg",
+        ],
+    }
+
+
+def ok_payload(raw_input: str, intent: dict, device: str, hits: list[dict]) -> dict:
+    return {
+        "status": "ok",
+        "experience_policy": "user_managed_only",
+        "can_generate_config": True,
+        "must_stop": False,
+        "input": raw_input,
+        "protocol": intent.get("protocol"),
+        "packet": intent.get("packet"),
+        "device": device,
+        "required_fields": intent.get("required_fields", []),
+        "placeholder_fields": intent.get("placeholder_fields", []),
+        "hits": hits,
+    }
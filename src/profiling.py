@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+PROFILE_ENV = "HUAWEI_RAG_PROFILE"
+PROFILE_DUMP_ENV = "HUAWEI_RAG_PROFILE_DUMP"
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Profiler:
+    """Collects per-phase wall time for one script run.
+
+    Phases are always timed (a perf_counter pair is cheap); the report is only
+    emitted once ``start`` enabled it, as one JSON line on stderr so the
+    script's stdout payload stays untouched.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.created = time.perf_counter()
+        self.enabled = False
+        self.phases: dict[str, list[float]] = {}
+        self._dump_path: Path | None = None
+        self._dumper = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.setdefault(name, []).append(time.perf_counter() - start)
+
+    def start(self, enabled: bool = False, dump_path: str | None = None) -> None:
+        """Enable reporting (flag or env var) and the optional profiler dump."""
+        self.enabled = enabled or os.environ.get(PROFILE_ENV, "") not in ("", "0")
+        dump_path = dump_path or os.environ.get(PROFILE_DUMP_ENV)
+        if dump_path:
+            self._dump_path = Path(dump_path).expanduser()
+            self._dumper = _start_dumper(self._dump_path)
+        if self.enabled or self._dumper is not None:
+            atexit.register(self.finish)
+
+    def report(self) -> dict:
+        return {
+            "script": self.name,
+            "total_ms": round((time.perf_counter() - self.created) * 1000, 3),
+            "phases": [
+                {"name": name, "ms": round(sum(times) * 1000, 3), "calls": len(times)}
+                for name, times in self.phases.items()
+            ],
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def finish(self) -> None:
+        if self._dumper is not None:
+            _stop_dumper(self._dumper, self._dump_path)
+            self._dumper = None
+        if self.enabled:
+            print(json.dumps({"profile": self.report()}, ensure_ascii=False), file=sys.stderr)
+            self.enabled = False
+
+
+def _start_dumper(path: Path):
+    if path.suffix == ".html":
+        try:
+            from pyinstrument import Profiler as PyinstrumentProfiler
+        except ImportError:
+            raise SystemExit("pyinstrument not installed; use a .prof path for a cProfile dump.")
+        dumper = PyinstrumentProfiler()
+        dumper.start()
+        return dumper
+    import cProfile
+
+    dumper = cProfile.Profile()
+    dumper.enable()
+    return dumper
+
+
+def _stop_dumper(dumper, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".html":
+        dumper.stop()
+        path.write_text(dumper.output_html(), encoding="utf-8")
+    else:
+        dumper.disable()
+        dumper.dump_stats(str(path))
+
+
+_active: Profiler | None = None
+
+
+def activate(profiler: Profiler) -> Profiler:
+    """Make ``profiler`` the target of module-level ``phase`` calls."""
+    global _active
+    _active = profiler
+    return profiler
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time ``name`` on the active profiler; a no-op when none is active."""
+    if _active is None:
+        yield
+        return
+    with _active.phase(name):
+        yield
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Print per-phase timings and peak RSS as JSON on stderr (or set {PROFILE_ENV}=1)",
+    )
+    parser.add_argument(
+        "--profile-dump",
+        help=f"Write a cProfile dump (.prof) or pyinstrument report (.html) here (or set {PROFILE_DUMP_ENV})",
+    )
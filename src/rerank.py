@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+from pathlib import Path
+from typing import Any
+
+from src.bm25 import tokenize
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WEIGHTS_PATH = ROOT / "experience" / "reranker.json"
+# Candidates reranked per query; bounds the stage's cost independently of
+# corpus size.
+RERANK_CANDIDATES = 50
+FEATURES = ("bm25", "heading_overlap", "has_cli", "protocol_match", "packet_match")
+
+
+def _named_in(name: str | None, heading_terms: set[str] | frozenset[str]) -> float:
+    tokens = tokenize(name or "")
+    return float(bool(tokens) and all(t in heading_terms for t in tokens))
+
+
+def chunk_features(
+    chunk: dict,
+    heading_terms: set[str] | frozenset[str],
+    score: float,
+    top_score: float,
+    terms: dict[str, float],
+    intent: dict[str, Any],
+) -> list[float]:
+    """Feature vector of one candidate, in ``FEATURES`` order, each in [0, 1].
+
+    ``heading_terms`` are the tokens of the chunk's heading path, stored at
+    build time like ``has_cli``; nothing here reads the chunk text.
+    """
+    total = sum(terms.values()) or 1.0
+    overlap = sum(w for t, w in terms.items() if t in heading_terms) / total
+    return [
+        score / top_score if top_score else 0.0,
+        overlap,
+        float(bool(chunk.get("has_cli"))),
+        _named_in(intent.get("protocol"), heading_terms),
+        _named_in(intent.get("packet"), heading_terms),
+    ]
+
+
+class Reranker:
+    """Linear model over ``chunk_features``; weights come from ``scripts/train_reranker.py``."""
+
+    def __init__(self, weights: dict[str, float]):
+        self.weights = weights
+        self._vector = [float(weights.get(name, 0.0)) for name in FEATURES]
+
+    @classmethod
+    def load(cls, path: Path | None = None) -> "Reranker":
+        """Weights from ``path`` (default ``experience/reranker.json``).
+
+        Without a weights file the model keeps the BM25 order.
+        """
+        path = path or DEFAULT_WEIGHTS_PATH
+        if not path.exists():
+            return cls({"bm25": 1.0})
+        return cls(json.loads(path.read_text(encoding="utf-8"))["weights"])
+
+    def score(self, features: list[float]) -> float:
+        return sum(w * f for w, f in zip(self._vector, features))
+
+
+def train_pairwise(
+    groups: list[list[tuple[list[float], bool]]],
+    epochs: int = 200,
+    lr: float = 0.05,
+    l2: float = 0.05,
+    seed: int = 0,
+) -> dict[str, float]:
+    """Fit weights with a pairwise logistic loss (RankNet) by SGD.
+
+    ``groups`` holds one list of ``(features, relevant)`` candidates per
+    labeled query; every relevant candidate should outscore every
+    irrelevant one of the same query. Every feature is evidence of
+    relevance, so weights are clipped at zero after each step: a small
+    labeled set cannot learn to penalize, say, a heading that names the
+    query's protocol.
+    """
+    pairs = [
+        (pos, neg)
+        for group in groups
+        for pos, pos_relevant in group
+        if pos_relevant
+        for neg, neg_relevant in group
+        if not neg_relevant
+    ]
+    weights = [1.0 if name == "bm25" else 0.0 for name in FEATURES]
+    rng = random.Random(seed)
+    for _ in range(epochs):
+        rng.shuffle(pairs)
+        for pos, neg in pairs:
+            diff = [a - b for a, b in zip(pos, neg)]
+            margin = sum(w * d for w, d in zip(weights, diff))
+            grad = 1.0 / (1.0 + math.exp(min(margin, 50.0)))
+            weights = [max(0.0, w + lr * (grad * d - l2 * w)) for w, d in zip(weights, diff)]
+    return {name: round(w, 4) for name, w in zip(FEATURES, weights)}
@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+import heapq
+import json
+from pathlib import Path
+
+from src.bm25 import BM25Index, token_spans, tokenize
+from src.dedup import collapse_hits, source_ref
+from src.devices import current_version_dir
+from src.filters import heading_postings, section_filter_mask
+from src.indexing import PAGES_FILE, load_bm25
+from src.profiling import phase
+from src.rerank import RERANK_CANDIDATES, Reranker, chunk_features
+from src.snippets import OFFSETS_FILE, TokenOffsets, make_snippet
+from src.synonyms import merge_terms, query_terms
+from src.terms import TermDictionary, expand_unknown_terms
+
+
+class SearchIndex:
+    """A loaded device index: chunk metadata, chunk BM25 and optional sections."""
+
+    def __init__(
+        self,
+        meta: list[dict],
+        bm25: BM25Index,
+        sections: list[dict] | None = None,
+        section_bm25: BM25Index | None = None,
+        version_dir: Path | None = None,
+    ):
+        self.version_dir = version_dir
+        self.meta = meta
+        self.bm25 = bm25
+        self.sections = sections or []
+        self.section_bm25 = section_bm25
+        self._sorted_sources: list[str] | None = None
+        self._section_headings: dict[str, list[int]] | None = None
+        # Folded duplicates sorted by source: (owners, refs, sources, headings).
+        self._duplicate_refs: tuple[list[int], list[dict], list[str], dict[str, list[int]]] | None = None
+        self._pages: dict[str, list[str]] | None = None
+        self._by_chunk_id: dict[str, int] | None = None
+        self._offsets: TokenOffsets | None = None
+        self._closed = False
+        self._term_dictionary: TermDictionary | None = None
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "SearchIndex":
+        """Load ``index_dir``, following its ``current`` pointer if versioned."""
+        index_dir = current_version_dir(index_dir)
+        with phase("load_meta"):
+            meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+        with phase("load_bm25"):
+            bm25 = load_bm25(index_dir / "bm25.pkl")
+        sections_path = index_dir / "sections.json"
+        section_bm25_path = index_dir / "sections_bm25.pkl"
+        if sections_path.exists() and section_bm25_path.exists():
+            with phase("load_sections"):
+                sections = json.loads(sections_path.read_text(encoding="utf-8"))
+                section_bm25 = load_bm25(section_bm25_path)
+            return cls(meta, bm25, sections, section_bm25, version_dir=index_dir)
+        return cls(meta, bm25, version_dir=index_dir)
+
+    def warm(self) -> None:
+        """Build the lazy BM25 structures now rather than on the first query."""
+        for bm25 in (self.bm25, self.section_bm25):
+            if bm25 is not None:
+                bm25.postings
+                bm25.doc_lens
+        self.term_dictionary
+
+    @property
+    def term_dictionary(self) -> TermDictionary:
+        if self._term_dictionary is None:
+            self._term_dictionary = TermDictionary(self.bm25.sorted_terms)
+        return self._term_dictionary
+
+    def query_terms(self, queries: list[str]) -> list[dict[str, float]]:
+        """Weighted terms of each of ``queries``, with the index's synonyms.
+
+        Query keywords missing from the index are expanded to the terms they
+        prefix or nearly spell (see ``src.terms``).
+        """
+        per_query = query_terms(queries, self.bm25.expansions)
+        with phase("term_lookup"):
+            return [expand_unknown_terms(t, self.term_dictionary, self.bm25.doc_freq) for t in per_query]
+
+    def _chunk_mask(self, allowed_sections: bytearray) -> bytearray:
+        mask = bytearray(len(self.meta))
+        for sid, allowed in enumerate(allowed_sections):
+            if allowed:
+                start, end = self.sections[sid]["start"], self.sections[sid]["end"]
+                mask[start:end] = b"\x01" * (end - start)
+        return mask
+
+    def filter_masks(self, filters: dict[str, list[str]]) -> tuple[bytearray | None, bytearray]:
+        """Section and chunk masks for ``filters`` (see ``src.filters``).
+
+        Chunks are indexed in sorted source order, so a source or type prefix
+        is one contiguous run of sections found by bisection, and a section
+        name is looked up in the sections' heading tokens. Indexes without
+        sections are filtered chunk by chunk. A chunk also passes when one of
+        its folded duplicates does, and its section is then allowed too, so
+        the section mask may be wider than the chunk mask.
+        """
+        if self.section_bm25 is None:
+            mask = section_filter_mask(self.meta, filters)
+            self._pass_duplicates(filters, mask)
+            return None, mask
+        if self._sorted_sources is None:
+            sources = [s.get("source") or "" for s in self.sections]
+            self._sorted_sources = sources if sources == sorted(sources) else []
+            self._section_headings = heading_postings(self.sections)
+        allowed = section_filter_mask(
+            self.sections, filters, self._sorted_sources or None, self._section_headings
+        )
+        mask = self._chunk_mask(allowed)
+        for i in self._pass_duplicates(filters, mask):
+            sid = self.meta[i].get("section_id")
+            if sid is not None and sid < len(allowed):
+                allowed[sid] = 1
+        return allowed, mask
+
+    def _pass_duplicates(self, filters: dict[str, list[str]], mask: bytearray) -> list[int]:
+        """Set ``mask`` for chunks that fail ``filters`` but have a duplicate
+        that passes; return those chunks.
+
+        The duplicates are kept sorted by source, so they are filtered by
+        bisection like the sections.
+        """
+        if self._duplicate_refs is None:
+            folded = sorted(
+                ((ref.get("source") or "", i, ref) for i, chunk in enumerate(self.meta)
+                 for ref in chunk.get("duplicates") or ()),
+                key=lambda entry: (entry[0], entry[1]),
+            )
+            refs = [ref for _, _, ref in folded]
+            self._duplicate_refs = (
+                [i for _, i, _ in folded], refs, [source for source, _, _ in folded], heading_postings(refs)
+            )
+        owners, refs, sources, headings = self._duplicate_refs
+        passing = section_filter_mask(refs, filters, sources, headings)
+        passed = []
+        n = passing.find(1)
+        while n != -1:
+            owner = owners[n]
+            if not mask[owner]:
+                mask[owner] = 1
+                passed.append(owner)
+            n = passing.find(1, n + 1)
+        return passed
+
+    def filter_ref(self, i: int, filters: dict[str, list[str]]) -> dict | None:
+        """The first folded duplicate of ``meta[i]`` passing ``filters`` when
+        ``meta[i]`` itself does not; otherwise ``None``."""
+        chunk = self.meta[i]
+        if section_filter_mask([chunk], filters)[0]:
+            return None
+        duplicates = chunk.get("duplicates") or []
+        for ref, ok in zip(duplicates, section_filter_mask(duplicates, filters)):
+            if ok:
+                return ref
+        return None
+
+    def section_mask(
+        self,
+        per_query: list[dict[str, float]],
+        limit: int,
+        allowed: bytearray | None = None,
+    ) -> bytearray | None:
+        """First pass: keep only the chunks of the ``limit`` best sections.
+
+        Only sections with a non-zero ``allowed`` byte compete. Returns
+        ``None`` when the index has no sections or few enough of them that
+        every chunk would be scored anyway.
+        """
+        if self.section_bm25 is None or limit <= 0 or len(self.sections) <= limit:
+            return None
+        scores = self.section_bm25.score_queries(per_query, allowed)
+        mask = bytearray(len(self.meta))
+        for sid in heapq.nlargest(limit, range(len(scores)), key=scores.__getitem__):
+            if scores[sid] <= 0:
+                break
+            section = self.sections[sid]
+            start, end = section["start"], section["end"]
+            mask[start:end] = b"\x01" * (end - start)
+        return mask
+
+    def offsets(self) -> TokenOffsets | None:
+        """Stored token offsets, mapped on first use; ``None`` for older indexes."""
+        if self._offsets is None and self.version_dir is not None and not self._closed:
+            path = self.version_dir / OFFSETS_FILE
+            if path.exists():
+                self._offsets = TokenOffsets(path, self.bm25.doc_lens)
+        return self._offsets
+
+    def snippet(self, i: int, terms: dict[str, float], width: int) -> dict:
+        """Best-matching ``width``-char passage of chunk ``i``.
+
+        Token offsets come from the index, so the chunk is not re-tokenized;
+        older indexes without them fall back to tokenizing the chunk.
+        """
+        text = self.meta[i].get("text") or ""
+        offsets = self.offsets()
+        if offsets is not None:
+            starts = offsets.doc(i)
+        else:
+            starts = [start for start, _ in token_spans(text)]
+        return make_snippet(text, self.bm25.docs[i], starts, terms, width)
+
+    def close(self) -> None:
+        """Unmap the stored offsets; a closed index still searches, building
+        snippets from the chunk text instead."""
+        self._closed = True
+        if self._offsets is not None:
+            self._offsets.close()
+            self._offsets = None
+
+    def heading_terms(self, i: int) -> frozenset[str]:
+        sid = self.meta[i].get("section_id")
+        if sid is not None and sid < len(self.sections) and "heading_terms" in self.sections[sid]:
+            return frozenset(self.sections[sid]["heading_terms"])
+        return frozenset(tokenize(self.meta[i].get("section") or ""))
+
+    def rerank(
+        self,
+        candidates: list[int],
+        scores: list[float],
+        terms: dict[str, float],
+        intent: dict,
+        reranker: Reranker,
+    ) -> tuple[list[int], dict[int, float]]:
+        """Reorder ``candidates`` (best BM25 first) by ``reranker``'s score."""
+        if not candidates:
+            return candidates, {}
+        top_score = scores[candidates[0]]
+        reranked = {
+            i: reranker.score(
+                chunk_features(self.meta[i], self.heading_terms(i), scores[i], top_score, terms, intent)
+            )
+            for i in candidates
+        }
+        return sorted(candidates, key=reranked.__getitem__, reverse=True), reranked
+
+    def pages(self) -> dict[str, list[str]]:
+        """Each source page's chunk ids before deduplication, read on first
+        use; empty for older indexes."""
+        if self._pages is None:
+            path = self.version_dir / PAGES_FILE if self.version_dir is not None else None
+            self._pages = json.loads(path.read_text(encoding="utf-8")) if path and path.exists() else {}
+        return self._pages
+
+    def chunk_index(self, chunk_id: str) -> int | None:
+        """Position in ``meta`` of ``chunk_id``; folded ids resolve to their
+        kept copy, as in ``src.chunk_store``."""
+        if self._by_chunk_id is None:
+            by_id: dict[str, int] = {}
+            for i, chunk in enumerate(self.meta):
+                by_id[chunk.get("chunk_id")] = i
+                for dup in chunk.get("duplicates") or ():
+                    by_id.setdefault(dup.get("chunk_id"), i)
+            self._by_chunk_id = by_id
+        return self._by_chunk_id.get(chunk_id)
+
+    def context(self, i: int, size: int, ref: dict | None = None) -> dict:
+        """Neighbouring chunks of ``meta[i]`` within its source page.
+
+        The window follows the page's chunk order before deduplication, so
+        chunks folded into another page's copy still appear, with that
+        copy's text. With ``ref`` (one of the chunk's folded duplicates) the
+        window is taken from that duplicate's page.
+        """
+        chunk = ref or self.meta[i]
+        order = self.pages().get(chunk.get("source") or "")
+        if order and chunk.get("chunk_id") in order:
+            pos = order.index(chunk["chunk_id"])
+
+            def _entry(chunk_id: str) -> dict:
+                j = self.chunk_index(chunk_id)
+                return {"chunk_id": chunk_id, "text": self.meta[j].get("text") if j is not None else None}
+
+            return {
+                "before": [_entry(c) for c in order[max(0, pos - size):pos]],
+                "after": [_entry(c) for c in order[pos + 1:pos + size + 1]],
+            }
+
+        start, end = 0, len(self.meta)
+        sid = self.meta[i].get("section_id")
+        if sid is not None and sid < len(self.sections):
+            start, end = self.sections[sid]["page"]
+
+        def _meta_entry(j: int) -> dict:
+            return {"chunk_id": self.meta[j].get("chunk_id"), "text": self.meta[j].get("text")}
+
+        return {
+            "before": [_meta_entry(j) for j in range(max(start, i - size), i)],
+            "after": [_meta_entry(j) for j in range(i + 1, min(end, i + size + 1))],
+        }
+
+    def candidates(
+        self,
+        queries: list[str],
+        sections: int = 20,
+        filters: dict[str, list[str]] | None = None,
+    ) -> tuple[dict[str, float], list[float], list[int]]:
+        """Merged query terms, chunk scores and matching chunks, best first.
+
+        Each query is scored on its own and a chunk keeps its best score, so
+        profile ``search_queries`` cannot drown out the user's words.
+        """
+        per_query = self.query_terms(queries)
+        terms = merge_terms(per_query)
+        allowed = filter_mask = None
+        if filters:
+            with phase("filter"):
+                allowed, filter_mask = self.filter_masks(filters)
+        with phase("section_pass"):
+            mask = self.section_mask(per_query, sections, allowed)
+            if mask is None:
+                mask = filter_mask
+            elif filter_mask is not None:
+                size = len(mask)
+                mask = bytearray(
+                    (int.from_bytes(mask, "little") & int.from_bytes(filter_mask, "little")).to_bytes(size, "little")
+                )
+        with phase("score"):
+            scores = self.bm25.score_queries(per_query, mask)
+            ranked = sorted(
+                (i for i, score in enumerate(scores) if score > 0),
+                key=scores.__getitem__,
+                reverse=True,
+            )
+        return terms, scores, ranked
+
+    def search(
+        self,
+        queries: list[str],
+        topk: int = 5,
+        sections: int = 20,
+        context: int = 0,
+        filters: dict[str, list[str]] | None = None,
+        snippet: int = 0,
+        reranker: Reranker | None = None,
+        rerank: int = 0,
+        intent: dict | None = None,
+    ) -> list[dict]:
+        """Rank chunks for ``queries`` and build hits.
+
+        ``queries[0]`` is the user's input and any further queries are profile
+        ``search_queries``; each is scored on its own and a chunk keeps its
+        best score (see ``candidates``).
+        ``sections`` limits the chunk pass to the children of that many top
+        sections (0 scores every chunk); ``context`` adds that many
+        neighbouring chunks on each side of a hit. ``filters`` restricts
+        both passes to matching chunks. With ``snippet`` set, hits carry that
+        many chars around the best match and highlight spans instead of the
+        full chunk text. With a ``reranker``, the ``rerank`` best BM25
+        candidates (at most ``RERANK_CANDIDATES``) are reordered by it, using
+        ``intent`` from ``detect_intent``; hits then carry a ``rerank_score``.
+        """
+        terms, scores, ranked = self.candidates(queries, sections, filters)
+        reranked: dict[int, float] = {}
+        # The rerank stage's cost is bounded whatever the caller asks for.
+        rerank = min(rerank, RERANK_CANDIDATES)
+        if reranker is not None and rerank > 0:
+            with phase("rerank"):
+                head, reranked = self.rerank(ranked[:rerank], scores, terms, intent or {}, reranker)
+                ranked = head + ranked[rerank:]
+        with phase("collapse"):
+            collapsed = collapse_hits(ranked, self.meta, topk)
+        hits = []
+        for i, duplicates in collapsed:
+            chunk = self.meta[i]
+            # A chunk let through by one of its duplicates is reported as it.
+            ref = self.filter_ref(i, filters) if filters else None
+            if ref is not None:
+                duplicates = [source_ref(chunk)] + [d for d in duplicates if d is not ref]
+            shown = ref or chunk
+            hit = {
+                "chunk_id": shown.get("chunk_id"),
+                "score": round(scores[i], 6),
+                "source": shown.get("source"),
+                "section": shown.get("section"),
+                "title": shown.get("title"),
+                "text": chunk.get("text"),
+                "duplicates": duplicates,
+            }
+            if i in reranked:
+                hit["rerank_score"] = round(reranked[i], 6)
+            if snippet > 0:
+                del hit["text"]
+                with phase("snippet"):
+                    hit.update(self.snippet(i, terms, snippet))
+            if context > 0:
+                hit["context"] = self.context(i, context, ref)
+            hits.append(hit)
+        return hits
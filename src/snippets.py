@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import mmap
+from array import array
+from itertools import accumulate
+from pathlib import Path
+
+from src.bm25 import token_spans
+
+OFFSETS_FILE = "offsets.bin"
+_TYPECODE = "I"
+
+
+def write_offsets(out_dir: Path, texts: list[str]) -> None:
+    """Write the start offset of every token of every text, back to back.
+
+    Doc ``i``'s offsets follow those of docs ``0..i-1``; its length is the
+    BM25 doc length, so no per-doc table is needed.
+    """
+    offsets = array(_TYPECODE)
+    for text in texts:
+        offsets.extend(start for start, _ in token_spans(text))
+    (out_dir / OFFSETS_FILE).write_bytes(offsets.tobytes())
+
+
+class TokenOffsets:
+    """Memory-mapped token start offsets, addressed by BM25 doc id."""
+
+    def __init__(self, path: Path, doc_lens: list[int]):
+        self._file = path.open("rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if path.stat().st_size else None
+        self._view = memoryview(self._map).cast(_TYPECODE) if self._map is not None else memoryview(array(_TYPECODE))
+        self._starts = [0, *accumulate(doc_lens)]
+
+    def doc(self, i: int) -> memoryview:
+        return self._view[self._starts[i]:self._starts[i + 1]]
+
+    def close(self) -> None:
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def best_window(
+    tokens: list[str],
+    starts,
+    terms: dict[str, float],
+    width: int,
+) -> tuple[int, int, list[tuple[int, int]]]:
+    """Char window of ``width`` holding the most query-term weight.
+
+    ``tokens`` and ``starts`` are a doc's tokens and their start offsets.
+    Each distinct term counts once per window, so a repeated common term does
+    not outweigh two different ones. Returns ``(start, end, highlights)``
+    with highlight spans in text offsets; ``end`` may exceed the text and is
+    clipped by the caller.
+    """
+    matches = [k for k, token in enumerate(tokens) if token in terms]
+    if not matches:
+        return 0, width, []
+
+    best = (0.0, 0, 0)
+    counts: dict[str, int] = {}
+    weight = 0.0
+    lo = 0
+    for hi, k in enumerate(matches):
+        term = tokens[k]
+        counts[term] = counts.get(term, 0) + 1
+        if counts[term] == 1:
+            weight += terms[term]
+        while lo < hi and starts[k] + len(term) - starts[matches[lo]] > width:
+            first = tokens[matches[lo]]
+            counts[first] -= 1
+            if counts[first] == 0:
+                weight -= terms[first]
+            lo += 1
+        if weight > best[0]:
+            best = (weight, lo, hi)
+
+    _, lo, hi = best
+    first, last = matches[lo], matches[hi]
+    span_start = starts[first]
+    span_end = starts[last] + len(tokens[last])
+    # Centre the matched span in the window.
+    start = max(0, span_start - (width - (span_end - span_start)) // 2)
+    highlights = [(starts[k], starts[k] + len(tokens[k])) for k in matches[lo:hi + 1]]
+    return start, start + width, highlights
+
+
+def make_snippet(text: str, tokens: list[str], starts, terms: dict[str, float], width: int) -> dict:
+    """Best ``width``-char passage of ``text`` with highlight spans relative to it."""
+    start, end, highlights = best_window(tokens, starts, terms, width)
+    end = min(end, len(text))
+    start = max(0, min(start, end - width))
+    spans: list[list[int]] = []
+    for s, e in highlights:
+        if s < start or e > end:
+            continue
+        if spans and spans[-1][1] == s - start:
+            # Adjacent tokens (a CJK word) form one highlight.
+            spans[-1][1] = e - start
+        else:
+            spans.append([s - start, e - start])
+    return {"snippet": text[start:end], "highlights": spans}
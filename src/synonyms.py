@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from src.bm25 import tokenize
+
+DEFAULT_SYNONYM_WEIGHT = 0.5
+
+# Phrase token tuple -> [(index term, weight)].
+Expansions = dict[tuple[str, ...], list[tuple[str, float]]]
+
+
+def compile_synonyms(groups: Iterable[dict[str, Any]], vocabulary: Iterable[str]) -> Expansions:
+    """Compile synonym groups into phrase -> weighted term expansions.
+
+    Every term of a group is keyed by its token tuple and expands to the
+    tokens of the group's other terms that it lacks. Expansion terms missing
+    from ``vocabulary`` can never score, so they are dropped at build time,
+    along with phrases left with nothing to expand to.
+    """
+    vocabulary = set(vocabulary)
+    merged: dict[tuple[str, ...], dict[str, float]] = {}
+    for group in groups:
+        weight = float(group.get("weight", DEFAULT_SYNONYM_WEIGHT))
+        phrases = [p for p in (tuple(tokenize(str(t))) for t in group.get("terms", [])) if p]
+        for phrase in phrases:
+            targets = merged.setdefault(phrase, {})
+            for other in phrases:
+                for term in other:
+                    if term in phrase or term not in vocabulary:
+                        continue
+                    targets[term] = max(targets.get(term, 0.0), weight)
+    return {phrase: sorted(targets.items()) for phrase, targets in merged.items() if targets}
+
+
+def match_expansions(tokens: list[str], expansions: Expansions) -> list[tuple[str, float]]:
+    """Expansion terms of every dictionary phrase occurring in ``tokens``."""
+    if not expansions:
+        return []
+    longest = max(map(len, expansions))
+    found = []
+    for i in range(len(tokens)):
+        for n in range(1, min(longest, len(tokens) - i) + 1):
+            found.extend(expansions.get(tuple(tokens[i:i + n]), ()))
+    return found
+
+
+def query_terms(queries: list[str], expansions: Expansions | None = None) -> list[dict[str, float]]:
+    """Weighted terms of each of ``queries``: its tokens weigh 1.0 and a
+    synonym its group weight. A term keeps its highest weight."""
+    per_query = []
+    for query in queries:
+        tokens = tokenize(query)
+        terms = dict.fromkeys(tokens, 1.0)
+        for term, weight in match_expansions(tokens, expansions or {}):
+            if weight > terms.get(term, 0.0):
+                terms[term] = weight
+        per_query.append(terms)
+    return per_query
+
+
+def merge_terms(per_query: list[dict[str, float]]) -> dict[str, float]:
+    """All terms of ``per_query`` in one query, each at its highest weight."""
+    merged: dict[str, float] = {}
+    for terms in per_query:
+        for term, weight in terms.items():
+            if weight > merged.get(term, 0.0):
+                merged[term] = weight
+    return merged
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Mapping
+
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+MIN_LOOKUP_LEN = 3
+MAX_EXPANSIONS = 5
+
+_PREFIX_END = "\U0010ffff"
+# Sorted ASCII terms starting with a letter lie in ["a", "{"); numbers sort
+# before them and CJK terms after.
+_LETTERS = ("a", "{")
+
+
+def _common_prefix_len(a: str, b: str, limit: int) -> int:
+    n = min(len(a), len(b), limit)
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TermDictionary:
+    """Sorted array of index terms with prefix and edit-distance lookup.
+
+    All terms sharing a prefix are one contiguous run, so prefix lookup is
+    two bisections and the array doubles as an implicit trie for fuzzy
+    lookup (see ``fuzzy``).
+    """
+
+    def __init__(self, terms: list[str]):
+        self.terms = terms
+
+    def _prefix_range(self, prefix: str, lo: int = 0) -> tuple[int, int]:
+        start = bisect_left(self.terms, prefix, lo)
+        return start, bisect_left(self.terms, prefix + _PREFIX_END, start)
+
+    def prefix(self, prefix: str) -> list[str]:
+        start, end = self._prefix_range(prefix)
+        return self.terms[start:end]
+
+    def fuzzy(self, word: str, max_dist: int) -> list[tuple[str, int]]:
+        """Terms within ``max_dist`` Levenshtein edits of ``word``.
+
+        Walks the sorted terms keeping one DP row per character of the
+        current term; a term reuses the rows of the prefix it shares with
+        the previous one. Once every cell of a row exceeds ``max_dist`` no
+        term with that prefix can match, and the whole run is skipped. A
+        lowercase ASCII keyword is only compared with the terms starting
+        with a letter.
+        """
+        terms = self.terms
+        start, end = 0, len(terms)
+        if word.isascii() and word.isalpha():
+            start, end = bisect_left(terms, _LETTERS[0]), bisect_left(terms, _LETTERS[1])
+        n = len(word)
+        rows = [list(range(n + 1))]
+        prev = ""
+        found = []
+        i = start
+        while i < end:
+            term = terms[i]
+            depth = _common_prefix_len(prev, term, len(rows) - 1)
+            del rows[depth + 1:]
+            pruned = False
+            while depth < len(term):
+                ch = term[depth]
+                above = rows[depth]
+                row = [depth + 1]
+                for j in range(1, n + 1):
+                    row.append(min(row[j - 1] + 1, above[j] + 1, above[j - 1] + (word[j - 1] != ch)))
+                if min(row) > max_dist:
+                    i = self._prefix_range(term[:depth + 1], i)[1]
+                    prev = term[:depth]
+                    pruned = True
+                    break
+                rows.append(row)
+                depth += 1
+            if pruned:
+                continue
+            if rows[len(term)][n] <= max_dist:
+                found.append((term, rows[len(term)][n]))
+            prev = term
+            i += 1
+        return found
+
+
+def _max_edits(token: str) -> int:
+    return 1 if len(token) < 8 else 2
+
+
+def expand_unknown_terms(
+    terms: dict[str, float],
+    dictionary: TermDictionary,
+    doc_freq: Mapping[str, int],
+) -> dict[str, float]:
+    """Add index terms for query terms the index does not contain.
+
+    Only ASCII keywords of ``MIN_LOOKUP_LEN`` or more letters are looked up:
+    a partial keyword (``silen``) expands to the terms it prefixes, failing
+    that a typo (``interfce``) to the terms within one edit (two for long
+    words). The ``MAX_EXPANSIONS`` most frequent candidates are added at
+    ``PREFIX_WEIGHT`` or ``FUZZY_WEIGHT / edits`` times the term's weight.
+    """
+    expanded = dict(terms)
+    for term, weight in terms.items():
+        if term in doc_freq or len(term) < MIN_LOOKUP_LEN or not term.isascii() or not term.isalpha():
+            continue
+        candidates = [(t, PREFIX_WEIGHT) for t in dictionary.prefix(term)]
+        if not candidates:
+            candidates = [(t, FUZZY_WEIGHT / d) for t, d in dictionary.fuzzy(term, _max_edits(term)) if d]
+        candidates.sort(key=lambda c: (-c[1], -doc_freq.get(c[0], 0), c[0]))
+        for candidate, candidate_weight in candidates[:MAX_EXPANSIONS]:
+            expanded[candidate] = max(expanded.get(candidate, 0.0), weight * candidate_weight)
+    return expanded
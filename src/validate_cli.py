@@ -2,51 +2,122 @@ from __future__ import annotations
 
 import json
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from jsonschema import Draft7Validator
 
+DEFAULT_SCHEMA_PATH = ".claude/skills/huawei-datacom-cli/schemas/cli_plan.schema.json"
+DEFAULT_RULES_PATH = ".claude/skills/huawei-datacom-cli/rules/dangerous_commands.txt"
+
+# Backreferences are numbered/named per pattern, so such rules cannot be
+# merged into the shared alternation.
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
 
 def _load_schema(schema_path: Path) -> dict:
     return json.loads(schema_path.read_text(encoding="utf-8"))
 
 
-def _load_rules(rules_path: Path) -> list[re.Pattern]:
-    patterns: list[re.Pattern] = []
+def _load_rule_lines(rules_path: Path) -> list[str]:
+    rules: list[str] = []
     if not rules_path.exists():
-        return patterns
+        return rules
     for line in rules_path.read_text(encoding="utf-8").splitlines():
         line = line.strip()
         if not line or line.startswith("#"):
             continue
-        patterns.append(re.compile(line, re.IGNORECASE))
-    return patterns
+        rules.append(line)
+    return rules
+
+
+class PlanValidator:
+    """Schema validator and dangerous-command rules compiled once.
+
+    Rules are merged into one alternation with a named group per rule, so a
+    command is scanned once and ``match.lastgroup`` names the rule that
+    fired. Rules that cannot be merged (backreferences, inline global flags)
+    are kept as separate patterns and tried afterwards.
+    """
+
+    def __init__(self, schema_path: Path, rules_path: Path):
+        self.schema_validator = Draft7Validator(_load_schema(schema_path))
+        self.rules = _load_rule_lines(rules_path)
+        self._combined: re.Pattern | None = None
+        self._group_rules: dict[str, str] = {}
+        self._separate: list[tuple[str, re.Pattern]] = []
+
+        mergeable = []
+        for rule in self.rules:
+            if _BACKREF_RE.search(rule):
+                self._separate.append((rule, re.compile(rule, re.IGNORECASE)))
+            else:
+                mergeable.append(rule)
+        if mergeable:
+            try:
+                self._combined = re.compile(
+                    "|".join(f"(?P<r{i}>{rule})" for i, rule in enumerate(mergeable)),
+                    re.IGNORECASE,
+                )
+                self._group_rules = {f"r{i}": rule for i, rule in enumerate(mergeable)}
+            except re.error:
+                self._separate = [(rule, re.compile(rule, re.IGNORECASE)) for rule in self.rules]
+
+    def match_rule(self, text: str) -> str | None:
+        """Return the dangerous rule that ``text`` triggers, if any."""
+        if self._combined is not None:
+            match = self._combined.search(text)
+            if match:
+                return self._group_rules[match.lastgroup]
+        for rule, pattern in self._separate:
+            if pattern.search(text):
+                return rule
+        return None
+
+    def validate(self, plan: dict[str, Any]) -> list[str]:
+        errors: list[str] = []
+        for err in sorted(self.schema_validator.iter_errors(plan), key=str):
+            errors.append(err.message)
+        if not isinstance(plan, dict):
+            errors.append("计划必须是 JSON 对象")
+            return errors
+
+        missing_fields = plan.get("missing_fields", [])
+        commands = plan.get("commands", [])
+        if missing_fields and commands:
+            errors.append("missing_fields 不为空时 commands 必须为空")
+
+        for idx, cmd in enumerate(commands):
+            refs = cmd.get("refs", []) if isinstance(cmd, dict) else []
+            if not refs:
+                errors.append(f"commands[{idx}].refs 不能为空")
+
+        for idx, cmd in enumerate(commands):
+            cmd_text = cmd.get("cmd", "") if isinstance(cmd, dict) else ""
+            rule = self.match_rule(cmd_text)
+            if rule is not None:
+                errors.append(f"命令触发禁用规则: commands[{idx}] '{cmd_text}' (规则: {rule})")
+
+        return errors
+
+
+def _mtime(path: Path) -> int | None:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=8)
+def _cached_validator(schema_path: Path, schema_mtime, rules_path: Path, rules_mtime) -> PlanValidator:
+    return PlanValidator(schema_path, rules_path)
+
+
+def get_validator(schema_path: Path, rules_path: Path) -> PlanValidator:
+    """Shared ``PlanValidator`` for these files, rebuilt when either changes."""
+    return _cached_validator(schema_path, _mtime(schema_path), rules_path, _mtime(rules_path))
 
 
 def validate_plan(plan: dict[str, Any], schema_path: Path, rules_path: Path) -> list[str]:
-    errors: list[str] = []
-    schema = _load_schema(schema_path)
-    validator = Draft7Validator(schema)
-    for err in sorted(validator.iter_errors(plan), key=str):
-        errors.append(err.message)
-
-    missing_fields = plan.get("missing_fields", [])
-    commands = plan.get("commands", [])
-    if missing_fields and commands:
-        errors.append("missing_fields 不为空时 commands 必须为空")
-
-    for idx, cmd in enumerate(commands):
-        refs = cmd.get("refs", []) if isinstance(cmd, dict) else []
-        if not refs:
-            errors.append(f"commands[{idx}].refs 不能为空")
-
-    patterns = _load_rules(rules_path)
-    for idx, cmd in enumerate(commands):
-        cmd_text = cmd.get("cmd", "") if isinstance(cmd, dict) else ""
-        for pattern in patterns:
-            if pattern.search(cmd_text):
-                errors.append(f"命令触发禁用规则: commands[{idx}] '{cmd_text}'")
-                break
-
-    return errors
+    return get_validator(schema_path, rules_path).validate(plan)
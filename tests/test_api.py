@@ -0,0 +1,93 @@
+import asyncio
+from pathlib import Path
+
+from src.api import ManualSearcher
+from src.indexing import build_index
+
+ROOT = Path(__file__).parent.parent
+
+
+def _searcher(tmp_path: Path, monkeypatch) -> ManualSearcher:
+    monkeypatch.setenv("HUAWEI_RAG_CACHE_DIR", str(tmp_path / "cache"))
+    md = tmp_path / "md"
+    md.mkdir()
+    (md / "ospf.md").write_text("# OSPF 基本配置\n\n```\nospf 1 router-id 1.1.1.1\narea 0\n```\n", encoding="utf-8")
+    (md / "bgp.md").write_text("# BGP 基本配置\n\n配置 BGP 邻居 peer as-number\n", encoding="utf-8")
+    build_index(md, tmp_path / "index")
+
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text('{"type": "object", "required": ["commands"]}', encoding="utf-8")
+    return ManualSearcher(root=ROOT, schema_path=schema_path, rules_path=tmp_path / "rules.txt")
+
+
+def test_search_payloads_match_cli_statuses(tmp_path: Path, monkeypatch):
+    with _searcher(tmp_path, monkeypatch) as searcher:
+        assert searcher.search("帮我测试一下ospf")["status"] == "missing_device"
+        assert searcher.search("ospf", device="usg", index_dir=str(tmp_path / "none"))["status"] == "missing_index"
+
+        result = searcher.search("帮我测试一下ospf", device="usg", index_dir=str(tmp_path / "index"))
+        assert result["status"] == "ok"
+        assert result["protocol"] == "ospf"
+        assert result["hits"][0]["source"] == "ospf.md"
+
+
+def test_async_methods_share_one_index(tmp_path: Path, monkeypatch):
+    searcher = _searcher(tmp_path, monkeypatch)
+    index_dir = str(tmp_path / "index")
+    plan = {"device": "usg", "commands": [{"cmd": "ospf 1", "refs": ["000001", "000002"]}]}
+
+    async def run():
+        async with searcher:
+            searches = [searcher.asearch("bgp 邻居", device="usg", index_dir=index_dir) for _ in range(8)]
+            validation = searcher.avalidate(plan, ground=True, index_dir=index_dir)
+            return await asyncio.gather(*searches), await validation
+
+    results, validation = asyncio.run(run())
+    assert {r["hits"][0]["source"] for r in results} == {"bgp.md"}
+    assert len(searcher._indexes) == 1
+    assert validation.keys() == {"status", "grounding_ms"}
+    assert validation["status"] == "ok"
+
+
+def test_reload_swaps_in_new_index_version(tmp_path: Path, monkeypatch):
+    searcher = _searcher(tmp_path, monkeypatch)
+    index_dir = tmp_path / "index"
+    with searcher:
+        first = searcher.search("isis", device="usg", index_dir=str(index_dir))
+        assert first["hits"] == []
+        old_index = searcher.get_index(index_dir)
+
+        (tmp_path / "md" / "isis.md").write_text("# IS-IS 基本配置\n\nisis 1 network-entity\n", encoding="utf-8")
+        build_index(tmp_path / "md", index_dir)
+        assert searcher.reload() == [index_dir]
+        assert searcher.reload() == []
+
+        assert old_index.search(["isis"]) == []
+        second = searcher.search("isis", device="usg", index_dir=str(index_dir))
+        assert second["hits"][0]["source"] == "isis.md"
+
+
+def test_reload_closes_replaced_versions_once_idle(tmp_path: Path, monkeypatch):
+    searcher = _searcher(tmp_path, monkeypatch)
+    index_dir = tmp_path / "index"
+    plan = {"device": "usg", "commands": [{"cmd": "ospf 1", "refs": ["000001", "000002"]}]}
+    with searcher:
+        searcher.search("ospf", device="usg", index_dir=str(index_dir), snippet=50)
+        searcher.validate(plan, ground=True, index_dir=str(index_dir))
+        old_index = searcher.get_index(index_dir)
+        assert old_index.offsets() is not None
+        assert old_index.version_dir in searcher._grounding._stores
+
+        with searcher._using(index_dir) as held:
+            build_index(tmp_path / "md", index_dir)
+            assert searcher.reload() == [index_dir]
+            assert held is old_index and held.offsets() is not None
+        assert old_index.offsets() is None
+        assert old_index.version_dir not in searcher._grounding._stores
+
+        assert searcher.validate(plan, ground=True, index_dir=str(index_dir))["status"] == "ok"
+        missing = {"device": "usg", "commands": [{"cmd": "ospf 1", "refs": ["999999"]}]}
+        invalid = searcher.validate(missing, ground=True, index_dir=str(index_dir))
+        assert invalid.keys() == {"status", "errors", "grounding_ms"}
+        assert invalid["errors"][0] == "commands[0].refs 在索引中不存在: 999999"
+        assert list(searcher._grounding._stores) == [searcher.get_index(index_dir).version_dir]
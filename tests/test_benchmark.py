@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from src.benchmark import (
+    compare_results,
+    generate_corpus,
+    load_labeled_queries,
+    percentile,
+    recall_at_k,
+    reciprocal_rank,
+    heldout_comparison,
+    run_size,
+)
+from src.experience import load_protocol_profiles
+from src.indexing import build_index
+from src.rerank import Reranker
+from src.search import SearchIndex
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_ranking_metrics():
+    ranked = [{"a.md"}, {"b.md"}, {"c.md", "d.md"}]
+    assert recall_at_k(ranked, ["b.md", "z.md"], 2) == 0.5
+    assert recall_at_k(ranked, ["d.md"], 2) == 0.0
+    assert reciprocal_rank(ranked, ["d.md"]) == 1 / 3
+    assert reciprocal_rank(ranked, ["c.md"]) == 1 / 3
+    assert reciprocal_rank(ranked, ["z.md"]) == 0.0
+    assert percentile([5.0, 1.0, 3.0], 50) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 100.0], 99) == 100.0
+
+
+def test_small_corpus_quality_floor(tmp_path: Path):
+    labeled = load_labeled_queries(ROOT / "docs" / "skill-tests" / "retrieval-queries.json")
+    profiles = load_protocol_profiles(ROOT / "experience" / "protocols")
+    result = run_size(tmp_path, 500, labeled, profiles, topk=5, repeat=1, reranker=Reranker({"bm25": 1.0}))
+    assert result["chunks"] >= 500
+    assert result["index_bytes"] > 0
+    assert result["recall@5"] >= 0.75
+    assert result["mrr"] >= 0.6
+    # A BM25-only model keeps the BM25 order.
+    assert result["rerank_mrr"] == result["mrr"]
+    assert 0.0 < result["rerank_p50_ms"] < 20
+
+    report = compare_results({"results": [dict(result, mrr=result["mrr"] / 2)]}, {"results": [result]})
+    assert report["500"]["mrr"]["change_pct"] == 100.0
+
+
+def test_heldout_comparison_reports_both_rankers(tmp_path: Path):
+    labeled = load_labeled_queries(ROOT / "docs" / "skill-tests" / "retrieval-queries.json")
+    profiles = load_protocol_profiles(ROOT / "experience" / "protocols")
+    generate_corpus(tmp_path / "corpus", 200)
+    build_index(tmp_path / "corpus", tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+    report = heldout_comparison(index, index, labeled[:3], profiles, epochs=5)
+    assert set(report) == {"bm25", "reranked"}
+    assert all(0.0 <= metrics["mrr"] <= 1.0 for metrics in report.values())
@@ -9,3 +9,32 @@ def test_bm25_ranks_relevant_doc_higher():
     index = BM25Index.build(docs)
     scores = index.score("ospf 配置")
     assert scores[0] > scores[1]
+
+
+def test_bm25_rare_term_outweighs_common_term():
+    docs = [
+        "ospf 配置 ospf 配置",
+        "ospf silent interface",
+        "ospf 配置 区域",
+    ]
+    index = BM25Index.build(docs)
+    scores = index.score("ospf silent")
+    assert max(range(len(docs)), key=scores.__getitem__) == 1
+    assert all(s > 0 for s in scores)
+
+
+def test_bm25_mask_limits_scored_docs():
+    docs = ["ospf 区域", "ospf 接口", "bgp 邻居"]
+    index = BM25Index.build(docs)
+    full = index.score("ospf")
+    masked = index.score("ospf", bytearray([0, 1, 0]))
+    assert masked == [0.0, full[1], 0.0]
+
+
+def test_bm25_score_queries_keeps_best_query_per_doc():
+    docs = ["ospf 区域", "ospf 接口", "bgp 邻居"]
+    index = BM25Index.build(docs)
+    queries = [{"ospf": 1.0, "区": 1.0}, {"ospf": 1.0, "bgp": 0.5}]
+    expected = [max(a, b) for a, b in zip(*(index.score_terms(q) for q in queries))]
+    assert index.score_queries(queries) == expected
+    assert index.score_queries(queries, bytearray([0, 1, 1])) == [0.0, expected[1], expected[2]]
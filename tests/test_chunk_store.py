@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from src.chunk_store import ChunkStore, write_chunk_store
+
+
+def test_chunk_store_reads_by_id_including_duplicates(tmp_path: Path):
+    chunks = [
+        {"chunk_id": "000001", "text": "ospf 1", "duplicates": []},
+        {"chunk_id": "000003", "text": "参数说明", "duplicates": [{"chunk_id": "000005"}]},
+    ]
+    write_chunk_store(tmp_path, chunks)
+
+    with ChunkStore(tmp_path) as store:
+        assert store.get("000001")["text"] == "ospf 1"
+        assert store.get("000005")["chunk_id"] == "000003"
+        assert store.get("000002") is None
+        assert store.get("999999") is None
+        assert store.get("abc") is None
@@ -14,3 +14,14 @@ OSPF 配置说明第一段。
     chunks = chunk_markdown(text, source="doc.md", max_chars=50)
     assert any(c["section"].startswith("OSPF") for c in chunks)
     assert all("text" in c for c in chunks)
+
+
+def test_chunk_markdown_tracks_heading_path():
+    text = "# OSPF\n\n正文\n\n## 接口\n\n接口说明\n\n### 参数\n\n参数说明\n\n## 区域\n\n区域说明\n"
+    chunks = chunk_markdown(text, source="doc.md")
+    assert [c["headings"] for c in chunks] == [
+        ["OSPF"],
+        ["OSPF", "接口"],
+        ["OSPF", "接口", "参数"],
+        ["OSPF", "区域"],
+    ]
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from src.bm25 import tokenize
+from src.chunk_store import ChunkStore
+from src.dedup import collapse_hits, dedup_chunks, hamming, simhash
+from src.indexing import build_index
+from src.search import SearchIndex
+
+
+PARAM_TABLE = (
+    "| 参数 | 参数说明 | 取值 |\n| --- | --- | --- |\n"
+    "| process-id | 指定OSPF进程号 | 整数形式，取值范围是1～4294967295 |\n"
+    "| router-id | 指定设备的Router ID | 点分十进制格式 |"
+)
+
+
+def test_simhash_near_duplicates_are_close():
+    a = simhash(tokenize(PARAM_TABLE))
+    b = simhash(tokenize(PARAM_TABLE + " 缺省值为1。"))
+    c = simhash(tokenize("bgp 邻居配置 基本步骤 peer as-number 指定对等体的AS号"))
+    assert hamming(a, b) < hamming(a, c)
+
+
+def test_dedup_chunks_keeps_first_and_lists_sources():
+    chunks = [
+        {"chunk_id": "000001", "source": "ospf.md", "section": "ospf", "text": PARAM_TABLE},
+        {"chunk_id": "000002", "source": "bgp.md", "section": "bgp", "text": "bgp 邻居配置 基本步骤"},
+        {"chunk_id": "000003", "source": "ospfv3.md", "section": "ospfv3", "text": PARAM_TABLE},
+    ]
+    kept = dedup_chunks(chunks)
+    assert [c["chunk_id"] for c in kept] == ["000001", "000002"]
+    assert kept[0]["duplicates"] == [
+        {"chunk_id": "000003", "source": "ospfv3.md", "section": "ospfv3", "title": None}
+    ]
+
+    hits = collapse_hits([0, 1], kept, topk=5)
+    assert [i for i, _ in hits] == [0, 1]
+
+
+BOILERPLATE = (
+    "修改OSPF定时器参数后，邻居关系可能会重新建立。两端设备的定时器配置必须保持一致，"
+    "否则无法建立邻居关系。缺省情况下，该功能处于未使能状态。当网络规模较大时，建议合理配置"
+    "定时器以减少资源占用。执行命令 system-view，进入系统视图。执行命令 interface 进入接口视图，"
+    "然后配置定时器。配置完成后，执行 display 命令检查配置结果。"
+)
+
+
+def test_command_variants_are_not_folded(tmp_path: Path):
+    md = tmp_path / "md"
+    md.mkdir()
+    for keyword in ("hello", "dead", "poll"):
+        (md / f"{keyword}.md").write_text(
+            f"# 配置OSPF定时器\n\n{BOILERPLATE}\n\n"
+            f"```\ninterface GigabitEthernet1/0/1\nospf timer {keyword} 10\n```\n\n"
+            f"## 背景\n\n{BOILERPLATE}\n",
+            encoding="utf-8",
+        )
+    stats = build_index(md, tmp_path / "index")
+    assert stats["duplicates"] == 2
+
+    hits = SearchIndex.load(tmp_path / "index").search(["ospf timer hello"])
+    assert hits[0]["source"] == "hello.md"
+    assert "ospf timer hello" in hits[0]["text"]
+    assert hits[0]["duplicates"] == []
+    with ChunkStore(tmp_path / "index") as store:
+        assert "ospf timer hello" in store.get(hits[0]["chunk_id"])["text"]
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from src.chunk_store import ChunkStore, write_chunk_store
+from src.grounding import check_grounding, command_keywords, grounding_errors
+
+# Per-plan budget for the grounding check on a small index.
+GROUNDING_BUDGET_MS = 20
+
+
+def _store(tmp_path: Path) -> ChunkStore:
+    write_chunk_store(tmp_path, [
+        {"chunk_id": "000001", "text": "```\nospf 1 router-id 1.1.1.1\narea 0\n```"},
+        {"chunk_id": "000002", "text": "```\ninterface GigabitEthernet1/0/1\nospf timer hello 10\n```"},
+    ])
+    return ChunkStore(tmp_path)
+
+
+def test_command_keywords_drop_placeholders_and_values():
+    assert command_keywords("ospf <process_id> router-id <router_id>") == ["ospf", "router", "id"]
+    assert command_keywords("ospf timer hello 10") == ["ospf", "timer", "hello"]
+    assert command_keywords("interface GigabitEthernet0/0/2") == ["interface", "gigabitethernet"]
+    assert command_keywords("interface Vlanif100") == ["interface", "vlanif"]
+
+
+def test_check_grounding_reports_ungrounded_commands(tmp_path: Path):
+    plan = {
+        "commands": [
+            {"cmd": "ospf <process_id> router-id <router_id>", "refs": ["000001"]},
+            {"cmd": "int GigabitEthernet0/0/2", "refs": ["000002"]},
+            {"cmd": "silent-interface all", "refs": ["000001", "000404"]},
+        ] * 10
+    }
+    with _store(tmp_path) as store:
+        report = check_grounding(plan, store)
+
+    assert {item["index"] % 3 for item in report["issues"]} == {2}
+    assert report["issues"][0]["missing_refs"] == ["000404"]
+    assert grounding_errors({"issues": report["issues"][:1]}) == [
+        "commands[2].refs 在索引中不存在: 000404",
+        "命令未在引用片段中找到依据: commands[2] 'silent-interface all'",
+    ]
+    assert report["elapsed_ms"] < GROUNDING_BUDGET_MS
@@ -0,0 +1,29 @@
+import json
+
+from src import profiling
+from src.profiling import Profiler
+
+
+def test_profiler_reports_phases_as_json(capsys, monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV, "1")
+    profiler = Profiler("test")
+    monkeypatch.setattr(profiling, "_active", profiler)
+    with profiling.phase("load"):
+        pass
+    with profiling.phase("load"):
+        pass
+    profiler.start()
+    profiler.finish()
+
+    report = json.loads(capsys.readouterr().err)["profile"]
+    assert report["script"] == "test"
+    assert report["phases"][0]["name"] == "load"
+    assert report["phases"][0]["calls"] == 2
+    assert report["total_ms"] >= report["phases"][0]["ms"]
+
+
+def test_phase_without_active_profiler_is_noop(monkeypatch):
+    monkeypatch.setattr(profiling, "_active", None)
+    with profiling.phase("anything"):
+        value = 1
+    assert value == 1
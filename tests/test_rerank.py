@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from src.indexing import build_index
+from src.rerank import FEATURES, Reranker, train_pairwise
+from src.search import SearchIndex
+
+
+def test_train_pairwise_learns_signal_and_keeps_evidence_nonnegative():
+    def vec(**values):
+        return [values.get(name, 0.0) for name in FEATURES]
+
+    groups = [
+        [(vec(bm25=0.6, packet_match=1.0, has_cli=0.0), True), (vec(bm25=1.0, has_cli=1.0), False)],
+        [(vec(bm25=0.5, packet_match=1.0, has_cli=0.0), True), (vec(bm25=0.9, has_cli=1.0), False)],
+    ]
+    weights = train_pairwise(groups, epochs=100)
+    assert weights["packet_match"] > 0
+    assert weights["has_cli"] == 0.0
+    reranker = Reranker(weights)
+    assert all(reranker.score(pos[0]) > reranker.score(neg[0]) for pos, neg in groups)
+
+
+def test_rerank_reorders_only_top_candidates(tmp_path: Path):
+    md = tmp_path / "md"
+    md.mkdir()
+    (md / "a.md").write_text("# OSPF 概述\n\nospf ospf hello 报文 hello\n", encoding="utf-8")
+    (md / "b.md").write_text("# 配置 Hello 报文定时器\n\n```\nospf timer hello 10\n```\n", encoding="utf-8")
+    (md / "c.md").write_text("# 其他\n\nhello\n", encoding="utf-8")
+    build_index(md, tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+    intent = {"protocol": "ospf", "packet": "hello"}
+
+    plain = index.search(["ospf hello 报文"], intent=intent)
+    assert plain[0]["source"] == "a.md"
+    assert all("rerank_score" not in h for h in plain)
+
+    reranker = Reranker({"bm25": 0.2, "packet_match": 1.0})
+    hits = index.search(["ospf hello 报文"], reranker=reranker, rerank=2, intent=intent)
+    assert [h["source"] for h in hits] == ["b.md", "a.md", "c.md"]
+    assert [("rerank_score" in h) for h in hits] == [True, True, False]
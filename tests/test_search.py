@@ -0,0 +1,152 @@
+from pathlib import Path
+
+import pytest
+
+from src.filters import parse_filters
+from src.indexing import build_index, new_version_name
+from src.search import SearchIndex
+
+
+def _write_manual(root: Path) -> None:
+    (root / "ospf").mkdir(parents=True)
+    (root / "ospf" / "basic.md").write_text(
+        "# OSPF 基本配置\n\n创建 OSPF 进程 ospf 1\n\n## 配置区域\n\narea 0 network 10.0.0.0 0.0.0.255\n",
+        encoding="utf-8",
+    )
+    (root / "bgp.md").write_text("# BGP 基本配置\n\n配置 BGP 邻居 peer as-number\n", encoding="utf-8")
+
+
+def test_two_stage_search_scores_only_top_sections(tmp_path: Path):
+    _write_manual(tmp_path / "md")
+    build_index(tmp_path / "md", tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+    assert len(index.sections) == 3
+
+    hits = index.search(["bgp 邻居"], topk=5, sections=1)
+    assert [h["source"] for h in hits] == ["bgp.md"]
+
+
+def test_search_returns_page_context(tmp_path: Path):
+    _write_manual(tmp_path / "md")
+    build_index(tmp_path / "md", tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+
+    hits = index.search(["area network"], topk=1, context=1)
+    assert hits[0]["section"] == "OSPF 基本配置 / 配置区域"
+    assert [c["text"] for c in hits[0]["context"]["before"]] == ["# OSPF 基本配置\n\n创建 OSPF 进程 ospf 1"]
+    assert hits[0]["context"]["after"] == []
+
+
+def test_context_keeps_chunks_folded_into_other_pages(tmp_path: Path):
+    table = (
+        "| 参数 | 参数说明 | 取值 |\n| --- | --- | --- |\n"
+        "| process-id | 指定OSPF进程号 | 整数形式，取值范围是1～4294967295 |\n"
+        "| router-id | 指定设备的Router ID | 点分十进制格式 |"
+    )
+    md = tmp_path / "md"
+    for rel, text in {
+        "命令参考/OSPF/ospf.md": f"# ospf\n\n## 格式\n\nospf [ process-id ]\n\n## 参数\n\n{table}\n\n## 示例\n\nospf 1 router-id 1.1.1.1\n",
+        "配置指南/OSPF/basic.md": f"# 配置OSPF\n\n## 参数\n\n{table}\n",
+    }.items():
+        (md / rel).parent.mkdir(parents=True, exist_ok=True)
+        (md / rel).write_text(text, encoding="utf-8")
+    assert build_index(md, tmp_path / "index")["duplicates"] == 1
+    index = SearchIndex.load(tmp_path / "index")
+
+    hits = index.search(["ospf 1 router-id 1.1.1.1"], topk=1, context=1)
+    assert hits[0]["source"] == "命令参考/OSPF/ospf.md" and hits[0]["section"].endswith("示例")
+    [before] = hits[0]["context"]["before"]
+    assert "参数说明" in before["text"]
+    assert index.chunk_index(before["chunk_id"]) is not None
+
+
+def test_rebuild_publishes_new_version_atomically(tmp_path: Path):
+    _write_manual(tmp_path / "md")
+    first = build_index(tmp_path / "md", tmp_path / "index", keep_versions=2)
+    second = build_index(tmp_path / "md", tmp_path / "index", keep_versions=2)
+    third = build_index(tmp_path / "md", tmp_path / "index", keep_versions=2)
+
+    versions = sorted(p.name for p in (tmp_path / "index" / "versions").iterdir())
+    assert versions == [second["version"], third["version"]]
+    assert first["version"] not in versions
+    assert (tmp_path / "index" / "current").read_text(encoding="utf-8").strip() == third["version"]
+    assert SearchIndex.load(tmp_path / "index").version_dir.name == third["version"]
+
+
+def test_filters_restrict_search_to_subtrees(tmp_path: Path):
+    md = tmp_path / "md"
+    for rel, text in {
+        "配置指南/OSPF/basic.md": "# 配置OSPF\n\nospf 1 area 0\n",
+        "命令参考/OSPF/ospf.md": "# ospf\n\nospf [ process-id ]\n",
+        "命令参考/BGP/peer.md": "# peer\n\npeer as-number\n",
+        "告警处理/OSPF/nbr.md": "# OSPF邻居状态变化\n\nospf nbr down\n",
+    }.items():
+        (md / rel).parent.mkdir(parents=True, exist_ok=True)
+        (md / rel).write_text(text, encoding="utf-8")
+    build_index(md, tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+
+    assert {h["source"] for h in index.search(["ospf"], filters=parse_filters(["type=command"]))} == {
+        "命令参考/OSPF/ospf.md"
+    }
+    hits = index.search(["ospf"], sections=0, filters=parse_filters(["source=告警处理/", "source=配置指南/"]))
+    assert {h["source"] for h in hits} == {"告警处理/OSPF/nbr.md", "配置指南/OSPF/basic.md"}
+    assert index.search(["ospf"], filters=parse_filters(["type=config", "section=邻居"])) == []
+    assert {h["source"] for h in index.search(["ospf"], filters=parse_filters(["section=邻居"]))} == {
+        "告警处理/OSPF/nbr.md"
+    }
+    assert [h["source"] for h in index.search(["peer"], filters=parse_filters(["section=pe"]))] == [
+        "命令参考/BGP/peer.md"
+    ]
+    with pytest.raises(ValueError):
+        parse_filters(["device=usg"])
+
+
+def test_filters_match_folded_duplicates(tmp_path: Path):
+    table = (
+        "| 参数 | 参数说明 | 取值 |\n| --- | --- | --- |\n"
+        "| process-id | 指定OSPF进程号 | 整数形式，取值范围是1～4294967295 |\n"
+        "| router-id | 指定设备的Router ID | 点分十进制格式 |"
+    )
+    md = tmp_path / "md"
+    for rel, text in {
+        "命令参考/OSPF/ospf.md": f"# ospf\n\n{table}\n",
+        "配置指南/OSPF/basic.md": f"# 配置OSPF\n\n{table}\n",
+        "命令参考/BGP/peer.md": "# peer\n\npeer as-number\n",
+    }.items():
+        (md / rel).parent.mkdir(parents=True, exist_ok=True)
+        (md / rel).write_text(text, encoding="utf-8")
+    build_index(md, tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+
+    for spec, source in (("type=config", "配置指南/OSPF/basic.md"), ("type=command", "命令参考/OSPF/ospf.md")):
+        for sections in (0, 1):
+            hits = index.search(["process-id router-id"], sections=sections, filters=parse_filters([spec]))
+            assert hits[0]["source"] == source, (spec, sections)
+            assert {d["source"] for d in hits[0]["duplicates"]} == {
+                "命令参考/OSPF/ospf.md", "配置指南/OSPF/basic.md"
+            } - {source}
+    hits = index.search(["process-id router-id"], filters=parse_filters(["type=command"]), context=1)
+    assert hits[0]["section"] == "ospf" and hits[0]["context"]["before"] == []
+    assert index.search(["process-id router-id"], filters=parse_filters(["type=alarm"])) == []
+
+
+def test_snippet_uses_stored_offsets(tmp_path: Path, monkeypatch):
+    (tmp_path / "md").mkdir()
+    body = "背景说明。" * 40 + "执行 silent-interface 命令禁止接口发送Hello报文。" + "其他内容。" * 40
+    (tmp_path / "md" / "ospf.md").write_text(f"# OSPF\n\n{body}\n", encoding="utf-8")
+    build_index(tmp_path / "md", tmp_path / "index", max_chars=2000)
+    index = SearchIndex.load(tmp_path / "index")
+
+    monkeypatch.setattr("src.search.token_spans", lambda text: pytest.fail("chunk re-tokenized"))
+    hit = index.search(["silent-interface hello"], topk=1, snippet=60)[0]
+    assert "text" not in hit
+    assert len(hit["snippet"]) == 60
+    assert [hit["snippet"][s:e] for s, e in hit["highlights"]] == ["silent", "interface", "Hello"]
+
+
+def test_version_names_sort_across_second_boundaries():
+    before = new_version_name(1_700_000_000_999_999_999)
+    after = new_version_name(1_700_000_001_000_000_000)
+    assert before == "20231114-221320-999999999"
+    assert sorted([after, before]) == [before, after]
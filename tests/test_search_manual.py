@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+SCRIPT = ROOT / "scripts" / "search_manual.py"
+
+# Allowed wall time of a warm early-exit run on top of a bare interpreter:
+# below the ~75 ms the early exit cost before the index imports were
+# deferred, so a regression to eager imports fails.
+STARTUP_BUDGET_MS = 60
+
+
+def _run(args: list[str], env: dict) -> tuple[float, subprocess.CompletedProcess]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=False)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _best_ms(args: list[str], env: dict, runs: int = 5) -> float:
+    return min(_run(args, env)[0] for _ in range(runs))
+
+
+def test_missing_device_fast_path(tmp_path: Path):
+    env = dict(os.environ, HUAWEI_RAG_CACHE_DIR=str(tmp_path))
+    args = [str(SCRIPT), "--input", "帮我测试一下ospf的hello报文"]
+
+    _, cold = _run(args, env)
+    assert cold.returncode == 2
+    assert (tmp_path / "protocol_profiles.json").exists()
+
+    _, warm = _run(["-X", "importtime", *args], env)
+    payload = json.loads(warm.stdout)
+    assert payload["status"] == "missing_device"
+    assert payload["protocol"] == "ospf"
+    assert payload["packet"] == "hello"
+    imported = {line.rsplit("|", 1)[-1].strip() for line in warm.stderr.splitlines() if "|" in line}
+    assert not imported & {"yaml", "pickle", "src.search", "src.bm25"}
+
+    overhead = _best_ms(args, env) - _best_ms(["-c", "pass"], env)
+    assert overhead < STARTUP_BUDGET_MS
+
+
+def test_missing_index_skips_index_imports(tmp_path: Path):
+    env = dict(os.environ, HUAWEI_RAG_CACHE_DIR=str(tmp_path))
+    _, result = _run(
+        ["-X", "importtime", str(SCRIPT), "--input", "ospf", "--device", "usg", "--index", str(tmp_path / "none")],
+        env,
+    )
+    assert result.returncode == 3
+    assert json.loads(result.stdout)["status"] == "missing_index"
+    imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if "|" in line}
+    assert "src.search" not in imported
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from src.experience import load_synonym_groups
+from src.indexing import build_index
+from src.search import SearchIndex
+from src.synonyms import compile_synonyms, merge_terms, query_terms
+
+
+def test_compile_synonyms_keeps_only_index_terms():
+    groups = [{"terms": ["邻居", "peer", "neighbor"]}, {"terms": ["hello报文", "hello packet"], "weight": 0.7}]
+    expansions = compile_synonyms(groups, {"peer", "hello", "packet", "邻", "居"})
+    assert expansions[("邻", "居")] == [("peer", 0.5)]
+    assert expansions[("neighbor",)] == [("peer", 0.5), ("居", 0.5), ("邻", 0.5)]
+    assert expansions[("hello", "报", "文")] == [("packet", 0.7)]
+
+    per_query = query_terms(["ospf 邻居", "OSPF 基本配置"], expansions)
+    assert per_query[0] == {"ospf": 1.0, "邻": 1.0, "居": 1.0, "peer": 0.5}
+    assert per_query[1] == {"ospf": 1.0, "基": 1.0, "本": 1.0, "配": 1.0, "置": 1.0}
+    assert merge_terms([{"ospf": 1.0, "peer": 0.5}, {"peer": 0.8}]) == {"ospf": 1.0, "peer": 0.8}
+
+
+def test_search_expands_chinese_query_to_english_manual_terms(tmp_path: Path):
+    (tmp_path / "md").mkdir()
+    (tmp_path / "md" / "bgp.md").write_text("# BGP\n\npeer 10.1.1.2 as-number 100\n", encoding="utf-8")
+    (tmp_path / "md" / "ospf.md").write_text("# OSPF\n\nospf 1 area 0\n", encoding="utf-8")
+    groups = load_synonym_groups(Path(__file__).resolve().parent.parent / "experience" / "synonyms")
+
+    build_index(tmp_path / "md", tmp_path / "plain")
+    assert SearchIndex.load(tmp_path / "plain").search(["邻居"]) == []
+
+    build_index(tmp_path / "md", tmp_path / "index", synonym_groups=groups)
+    hits = SearchIndex.load(tmp_path / "index").search(["邻居"])
+    assert [h["source"] for h in hits] == ["bgp.md"]
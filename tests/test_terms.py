@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from src.indexing import build_index
+from src.search import SearchIndex
+from src.terms import TermDictionary
+
+
+def _levenshtein(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(cur[-1] + 1, prev[j] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def test_term_dictionary_prefix_and_fuzzy_lookup():
+    terms = sorted(["interface", "interval", "int", "internal", "silent", "silence", "ospf", "area", "10", "区"])
+    dictionary = TermDictionary(terms)
+    assert dictionary.prefix("silen") == ["silence", "silent"]
+    assert dictionary.prefix("bgp") == []
+    for word, edits in [("interfce", 1), ("intervl", 2), ("ospff", 1), ("are", 1)]:
+        expected = sorted((t, _levenshtein(word, t)) for t in terms if _levenshtein(word, t) <= edits)
+        assert sorted(dictionary.fuzzy(word, edits)) == expected
+
+
+def test_search_tolerates_typos_and_partial_keywords(tmp_path: Path):
+    (tmp_path / "md").mkdir()
+    (tmp_path / "md" / "silent.md").write_text("# silent-interface\n\nsilent-interface { all | interface-type }\n", encoding="utf-8")
+    (tmp_path / "md" / "area.md").write_text("# area\n\narea area-id\n", encoding="utf-8")
+    build_index(tmp_path / "md", tmp_path / "index")
+    index = SearchIndex.load(tmp_path / "index")
+
+    assert [h["source"] for h in index.search(["ospf silent-interfce"])] == ["silent.md"]
+    assert [h["source"] for h in index.search(["silen"])] == ["silent.md"]
@@ -1,6 +1,11 @@
+import json
+import subprocess
+import sys
 from pathlib import Path
 
-from src.validate_cli import validate_plan
+from src.validate_cli import PlanValidator, validate_plan
+
+ROOT = Path(__file__).parent.parent
 
 
 def test_validate_cli_missing_refs_fails():
@@ -16,3 +21,46 @@ def test_validate_cli_missing_refs_fails():
     }
     errors = validate_plan(plan, schema_path, rules_path)
     assert any("refs" in e for e in errors)
+
+
+def _write_validator_files(tmp_path: Path) -> tuple[Path, Path]:
+    schema_path = tmp_path / "schema.json"
+    schema_path.write_text('{"type": "object", "required": ["commands"]}', encoding="utf-8")
+    rules_path = tmp_path / "rules.txt"
+    rules_path.write_text(
+        "# dangerous commands\n^reset\\s+saved-configuration\nundo\\s+ospf\n(\\w+)\\s+\\1\n",
+        encoding="utf-8",
+    )
+    return schema_path, rules_path
+
+
+def test_plan_validator_reports_rule_that_fired(tmp_path: Path):
+    validator = PlanValidator(*_write_validator_files(tmp_path))
+    assert validator.match_rule("undo ospf 1") == "undo\\s+ospf"
+    assert validator.match_rule("peer peer") == "(\\w+)\\s+\\1"
+    assert validator.match_rule("ospf 1") is None
+
+    plan = {"commands": [{"cmd": "reset saved-configuration", "refs": ["000001"]}]}
+    errors = validator.validate(plan)
+    assert errors == ["命令触发禁用规则: commands[0] 'reset saved-configuration' (规则: ^reset\\s+saved-configuration)"]
+    assert validator.validate({"commands": [{"cmd": "ospf 1", "refs": ["000001"]}]}) == []
+
+
+def test_batch_reports_non_object_plans_per_line(tmp_path: Path):
+    schema_path, rules_path = _write_validator_files(tmp_path)
+    batch = tmp_path / "plans.jsonl"
+    batch.write_text('[1, 2]\n{"commands": [{"cmd": "ospf 1", "refs": ["000001"]}]}\n', encoding="utf-8")
+    result = subprocess.run(
+        [
+            sys.executable, str(ROOT / "scripts" / "validate_cli.py"),
+            "--batch", str(batch), "--schema", str(schema_path), "--rules", str(rules_path),
+            "--ground", "--index", str(tmp_path / "index"),
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    output = json.loads(result.stdout)
+    assert output["total"] == 2
+    assert "计划必须是 JSON 对象" in output["results"][0]["errors"]
+    assert output["results"][1]["errors"] == ["无法进行依据校验: 索引不存在 " + str(tmp_path / "index")]